@@ -1,95 +1,209 @@
 
+import argparse
+import codecs
+import itertools
 import sys
 import json
 import subprocess
 from pathlib import Path
 import re
 
+# Search results list resources as: - [Title] (URI) or - Title (URI)
+_URI_RE = re.compile(r'\(([^)]+)\)')
+_URI_SCHEMES = ("file://", "http", "mcp://")
+
+def iter_match_lines(text: str, query: str):
+    """
+    Yield (line_number, line) for each line of text containing query (case-insensitive).
+    Sweeps the lowered text with str.find instead of splitting and lowering every line.
+    """
+    lc = text.lower()
+    q = query.lower()
+    if len(lc) != len(text):
+        # Lowercasing changed offsets (rare Unicode case); scan line by line.
+        for n, line in enumerate(text.split('\n')):
+            if q in line.lower():
+                yield n + 1, line
+        return
+
+    line_no = 1
+    pos = 0
+    idx = lc.find(q)
+    while idx != -1:
+        line_no += lc.count('\n', pos, idx)
+        start = lc.rfind('\n', 0, idx) + 1
+        end = lc.find('\n', idx)
+        if end == -1:
+            end = len(lc)
+        yield line_no, text[start:end]
+        # Resume on the next line so a line with several hits is reported once
+        if end == len(lc):
+            break
+        pos = end
+        idx = lc.find(q, end + 1)
+
+class ResponseReader:
+    """
+    Decode JSON-RPC responses straight off the server's binary stdout.
+
+    Chunks from read1() are fed to JSONDecoder.raw_decode as soon as a full
+    line has arrived, instead of materialising each line via readline() and
+    parsing it again with json.loads(). Chunks are collected in a list and
+    joined once per newline, and messages are decoded in place by offset, so
+    a multi-MB response is copied a constant number of times, not per chunk.
+    """
+
+    _WHITESPACE = re.compile(r"\s*")
+
+    def __init__(self, stream):
+        self._stream = stream
+        self._json = json.JSONDecoder()
+        self._utf8 = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self._buf = ""  # joined text; the next message starts at self._pos
+        self._pos = 0
+        self._pending = []  # chunks that arrived after the last newline
+        self._complete = False  # a newline-terminated message may be buffered
+
+    def read(self):
+        while True:
+            if self._complete:
+                # The server writes one message per line, so a buffered newline
+                # means the next message is whole; a decode error is real.
+                obj, end = self._json.raw_decode(self._buf, self._pos)
+                self._advance(end)
+                return obj
+            chunk = self._stream.read1(65536)
+            if not chunk:
+                raise EOFError("Server closed the connection")
+            text = self._utf8.decode(chunk)
+            self._pending.append(text)
+            if "\n" in text:
+                self._pending.insert(0, self._buf[self._pos:])
+                self._buf = "".join(self._pending)
+                self._pending.clear()
+                self._advance(0)
+
+    def _advance(self, pos):
+        """Skip whitespace between messages and note whether a whole one is buffered."""
+        self._pos = self._WHITESPACE.match(self._buf, pos).end()
+        self._complete = self._buf.find("\n", self._pos) != -1
+
+def send(process, *messages) -> None:
+    """Write one or more JSON-RPC messages to the server in a single flush."""
+    payload = "".join(json.dumps(m) + "\n" for m in messages)
+    process.stdin.write(payload.encode("utf-8"))
+    process.stdin.flush()
+
+def answer_query(process, reader: ResponseReader, query: str, ids) -> None:
+    """Search the knowledge base for query and print matching snippets.
+
+    `ids` is an iterator of JSON-RPC request ids shared across calls, so a
+    persistent server session never sees a reused id.
+    """
+    # 2. Search
+    print(f"🔍 Searching for: '{query}'")
+    req = {
+        "jsonrpc": "2.0", 
+        "id": next(ids), 
+        "method": "tools/call",
+        "params": {
+            "name": "search_knowledge_base",
+            "arguments": {"query": query}
+        }
+    }
+    send(process, req)
+    
+    resp = reader.read()
+    content = resp.get("result", {}).get("content", [{}])[0].get("text", "")
+    
+    if "No results found" in content:
+        print("❌ No results found.")
+        return
+
+    print("✅ Found matches. Retrieving content...")
+    
+    # 3. Extract URIs and Read Content
+    # Skip anything that's not a valid URI format we recognize (simple check)
+    uris = [
+        m.group(1) for m in _URI_RE.finditer(content)
+        if m.group(1).startswith(_URI_SCHEMES)
+    ]
+
+    # Pipeline: send every read request up front, then collect the responses,
+    # so the whole phase costs ~1 round-trip instead of one per URI.
+    read_ids = [next(ids) for _ in uris]
+    read_reqs = [
+        {
+            "jsonrpc": "2.0",
+            "id": read_id,
+            "method": "resources/read",
+            "params": {"uri": uri}
+        }
+        for read_id, uri in zip(read_ids, uris)
+    ]
+    if read_reqs:
+        send(process, *read_reqs)
+
+    responses = {}
+    for _ in uris:
+        read_resp = reader.read()
+        responses[read_resp.get("id")] = read_resp
+
+    for read_id, uri in zip(read_ids, uris):
+        print(f"\n📥 Reading: {uri}")
+        read_resp = responses.get(read_id, {})
+        file_content = read_resp.get("result", {}).get("contents", [{}])[0].get("text", "")
+        
+        # Simple snippet extraction (primitive "RAG")
+        # Find the line with the query or just print first 500 chars
+        print("-" * 20)
+        matches = list(iter_match_lines(file_content, query))
+        if matches:
+            # Print lines surrounding the match
+            for line_no, line in matches:
+                print(f"MATCH (Line {line_no}): {line.strip()}")
+        else:
+            print("Content Preview:")
+            print(file_content[:500])
+        print("-" * 20)
+
 def main():
-    if len(sys.argv) < 2:
-        print("Usage: python3 answer_query.py <query>")
+    parser = argparse.ArgumentParser(description="Query the Librarian knowledge base.")
+    parser.add_argument("query", nargs="?", help="Search term")
+    parser.add_argument("--repl", action="store_true",
+                        help="Keep the server running and read one query per line from stdin")
+    args = parser.parse_args()
+    if not args.query and not args.repl:
+        print("Usage: python3 answer_query.py <query> | --repl")
         sys.exit(1)
-        
-    query = sys.argv[1]
+
     server_script = Path("mcp.py").resolve()
     
     cmd = [sys.executable, str(server_script), "--server"]
+    # stderr is never read; discard it so a long --repl session can't fill the pipe
     process = subprocess.Popen(
         cmd, 
         stdin=subprocess.PIPE, 
         stdout=subprocess.PIPE, 
-        stderr=subprocess.PIPE,
-        text=True,
-        bufsize=1
+        stderr=subprocess.DEVNULL,
     )
+    reader = ResponseReader(process.stdout)
+    ids = itertools.count(1)
 
     try:
         # 1. Initialize
-        process.stdin.write(json.dumps({"jsonrpc": "2.0", "id": 1, "method": "initialize"}) + "\n")
-        process.stdin.flush()
-        process.stdout.readline()
-
-        # 2. Search
-        print(f"🔍 Searching for: '{query}'")
-        req = {
-            "jsonrpc": "2.0", 
-            "id": 2, 
-            "method": "tools/call",
-            "params": {
-                "name": "search_knowledge_base",
-                "arguments": {"query": query}
-            }
-        }
-        process.stdin.write(json.dumps(req) + "\n")
-        process.stdin.flush()
-        
-        line = process.stdout.readline()
-        resp = json.loads(line)
-        content = resp.get("result", {}).get("content", [{}])[0].get("text", "")
-        
-        if "No results found" in content:
-            print("❌ No results found.")
-            return
+        send(process, {"jsonrpc": "2.0", "id": next(ids), "method": "initialize"})
+        reader.read()
 
-        print("✅ Found matches. Retrieving content...")
-        
-        # 3. Extract URIs and Read Content
-        # Regex to find URIs in the search result list: - [Title] (URI) or - Title (URI)
-        uris = re.findall(r'\(([^)]+)\)', content)
-        
-        for uri in uris:
-            # Skip if it's not a valid URI format we recognize (simple check)
-            if not (uri.startswith("file://") or uri.startswith("http") or uri.startswith("mcp://")):
-                continue
-                
-            print(f"\n📥 Reading: {uri}")
-            read_req = {
-                "jsonrpc": "2.0", 
-                "id": 3, 
-                "method": "resources/read",
-                "params": {"uri": uri}
-            }
-            process.stdin.write(json.dumps(read_req) + "\n")
-            process.stdin.flush()
-            
-            read_line = process.stdout.readline()
-            read_resp = json.loads(read_line)
-            
-            file_content = read_resp.get("result", {}).get("contents", [{}])[0].get("text", "")
-            
-            # Simple snippet extraction (primitive "RAG")
-            # Find the line with the query or just print first 500 chars
-            print("-" * 20)
-            if query.lower() in file_content.lower():
-                # Print lines surrounding the match
-                lines = file_content.split('\n')
-                for i, line in enumerate(lines):
-                    if query.lower() in line.lower():
-                        print(f"MATCH (Line {i+1}): {line.strip()}")
-            else:
-                print("Content Preview:")
-                print(file_content[:500])
-            print("-" * 20)
+        if args.query:
+            answer_query(process, reader, args.query, ids)
+        if args.repl:
+            # Server stays warm: no interpreter/import start-up cost per query
+            for line in sys.stdin:
+                query = line.strip()
+                if query:
+                    answer_query(process, reader, query, ids)
+                    sys.stdout.flush()
 
     except Exception as e:
         print(f"❌ Error: {e}")
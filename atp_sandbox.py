@@ -15,15 +15,328 @@ SECURITY ASSUMPTIONS:
 DESIGN RATIONALE:
 - Dual-phase security: AST analysis catches structural attacks, string patterns catch obfuscation
 - Redundancy ensures no single bypass defeats both defenses
-- StringIO capture ensures tool protocol integrity (agent cannot inject output)
+- StringIO capture ensures tool protocol integrity (agent cannot inject output);
+  print() is rebound per call, so process-global sys.stdout is never swapped
+  and concurrent executions cannot clobber each other's capture
 - Exception handling logs all violations for observability
 """
 
+import ast
 import json
 import datetime
 import math
-import sys
+import re
 import io
+import functools
+import hashlib
+import marshal
+import os
+import sys
+import threading
+import textwrap
+from pathlib import Path
+from types import CodeType, MappingProxyType
+from typing import Any, Dict, Optional, Tuple
+try:
+    import numba
+    import numpy as np
+except ImportError:
+    numba = None
+    np = None
+
+
+# DoS guards: reject oversized or pathologically nested snippets before/while parsing
+MAX_CODE_LEN = 16_384
+MAX_AST_DEPTH = 32
+# Nodes that open a nesting level (blocks, scopes, containers, call arguments). Operand
+# chains (a + b + c, a and b, a < b < c), elif ladders and method chains stay flat, since
+# the parser and compiler already bound those with their own recursion limits.
+_NESTING_NODES = frozenset({
+    ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef, ast.Lambda,
+    ast.If, ast.For, ast.AsyncFor, ast.While, ast.With, ast.AsyncWith, ast.Try,
+    ast.ListComp, ast.SetComp, ast.DictComp, ast.GeneratorExp,
+    ast.List, ast.Tuple, ast.Set, ast.Dict, ast.Call,
+} | ({ast.TryStar} if hasattr(ast, "TryStar") else set()))
+
+# Expanded forbidden set — blocks class-escape vectors
+_FORBIDDEN_NAMES = frozenset({
+    'import', 'eval', 'exec', 'open', 'globals',
+    'locals', 'input', 'getattr', 'setattr', 'delattr',
+    'vars', 'dir', 'compile', 'breakpoint',
+})
+# Forbidden callable names (blocks type() class escape)
+_FORBIDDEN_CALLS = frozenset({'type', 'getattr', 'setattr', 'vars', 'dir', 'compile'})
+# Phase 2 substrings (redundant string-level defense), scanned in a single pass
+_DANGEROUS_SUBSTRINGS = ('import ', 'eval(', 'exec(', 'open(', 'globals(', '.__')
+_DANGEROUS_RE = re.compile('|'.join(re.escape(d) for d in _DANGEROUS_SUBSTRINGS))
+# Every dangerous pattern contains one of these; code without them skips the regex
+_DANGEROUS_TRIGGERS = ('(', '_', 'import')
+# Names injected into the sandbox namespace; everything else was set by the snippet
+_INJECTED_NAMES = frozenset({"__builtins__", "json", "datetime", "math", "context", "result"})
+# Shared read-only stand-in for a missing context (no per-call empty dict)
+_EMPTY_CONTEXT = MappingProxyType({})
+
+
+def _check_tree(tree: ast.AST) -> Tuple[Optional[str], bool]:
+    """
+    Phase 1 AST scan: a flat iterative walk that only gathers identifiers;
+    the forbidden-name checks then run as C-level set intersections instead
+    of per-node membership tests. Imports and nesting deeper than
+    MAX_AST_DEPTH abort the walk immediately; only _NESTING_NODES count
+    towards the depth, so long flat expressions are accepted.
+
+    Returns:
+        tuple: (error_msg or None, uses_stdout) — uses_stdout is set when the
+               snippet can write to stdout; otherwise capture is skipped
+    """
+    names = set()
+    attrs = set()
+    called = set()
+    stack = [(tree, 0)]
+    while stack:
+        node, depth = stack.pop()
+        if depth > MAX_AST_DEPTH:
+            return f"Security Violation: code nesting exceeds {MAX_AST_DEPTH} levels.", False
+        t = type(node)
+        if t in _NESTING_NODES:
+            # The callee of a call and an elif branch continue a chain, not a new level
+            if t is ast.Call:
+                flat = node.func
+            elif t is ast.If and len(node.orelse) == 1 and type(node.orelse[0]) is ast.If:
+                flat = node.orelse[0]
+            else:
+                flat = None
+            stack.extend((child, depth if child is flat else depth + 1) for child in ast.iter_child_nodes(node))
+        else:
+            stack.extend((child, depth) for child in ast.iter_child_nodes(node))
+        if t is ast.Name:
+            names.add(node.id)
+        elif t is ast.Attribute:
+            attrs.add(node.attr)
+        elif t is ast.Call:
+            if type(node.func) is ast.Name:
+                called.add(node.func.id)
+        elif t is ast.Import:
+            return "Security Violation: 'import' is forbidden.", False
+        elif t is ast.ImportFrom:
+            return "Security Violation: 'from ... import' is forbidden.", False
+
+    # Block dangerous built-in calls that enable class-hierarchy escape
+    bad = called & _FORBIDDEN_CALLS
+    if bad:
+        return f"Security Violation: call to '{min(bad)}()' is forbidden.", False
+    bad = names & _FORBIDDEN_NAMES
+    if bad:
+        return f"Security Violation: '{min(bad)}' is forbidden.", False
+    for name in names:
+        if name.startswith('__'):
+            return f"Security Violation: '{name}' (dunder) is forbidden.", False
+    for attr in attrs:
+        if attr.startswith('__'):
+            return f"Security Violation: dunder attribute '{attr}' is forbidden.", False
+    return None, 'print' in names or 'stdout' in attrs
+
+
+# Bump when the on-disk entry layout changes; stale entries are then ignored
+_CODE_CACHE_SCHEMA = 2
+
+
+def _validate_uncached(code: str) -> Tuple[Optional[CodeType], bool, Optional[str]]:
+    """
+    Run both security phases and compile the snippet.
+
+    Returns:
+        tuple: (code_obj, uses_stdout, None) if the code is safe,
+               (None, False, error_msg) otherwise
+    """
+    # Phase 1: AST Analysis (Structural Security)
+    try:
+        tree = ast.parse(code)
+    except SyntaxError as e:
+        return None, False, f"Syntax Error: {str(e)}"
+
+    error, uses_stdout = _check_tree(tree)
+    if error:
+        return None, False, error
+
+    # Phase 2: String-based defense (redundancy)
+    if any(t in code for t in _DANGEROUS_TRIGGERS):
+        m = _DANGEROUS_RE.search(code)
+        if m:
+            return None, False, f"Security Violation: Found forbidden pattern '{m.group(0)}'."
+
+    # optimize=2 drops asserts and docstrings: less bytecode to run per call
+    return compile(tree, "<atp>", "exec", optimize=2), uses_stdout, None
+
+
+def _disk_cache_path(code: str, cache_dir: str) -> Path:
+    return Path(cache_dir) / f"{hashlib.sha256(code.encode()).hexdigest()}.pyc"
+
+
+def _disk_cache_load(path: Path) -> Optional[Tuple[CodeType, bool, None]]:
+    """Load a previously validated code object; None on miss or stale entry."""
+    try:
+        schema, tag, uses_stdout, code_obj = marshal.loads(path.read_bytes())
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+    # marshal's format is interpreter-specific, so entries only match their own build
+    if schema != _CODE_CACHE_SCHEMA or tag != sys.implementation.cache_tag:
+        return None
+    if not isinstance(code_obj, CodeType):
+        return None
+    return code_obj, bool(uses_stdout), None
+
+
+def _disk_cache_store(path: Path, code_obj: CodeType, uses_stdout: bool) -> None:
+    """Persist a validated code object; write failures only cost a future re-validation."""
+    blob = marshal.dumps((_CODE_CACHE_SCHEMA, sys.implementation.cache_tag, uses_stdout, code_obj))
+    tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp.write_bytes(blob)
+        os.replace(tmp, path)
+    except OSError:
+        tmp.unlink(missing_ok=True)
+
+
+@functools.lru_cache(maxsize=512)
+def _validate_and_compile(code: str, cache_dir: Optional[str] = None) -> Tuple[Optional[CodeType], bool, Optional[str]]:
+    """
+    Validate and compile the snippet, memoizing the verdict.
+
+    Agent snippets are highly repetitive (filter/map/reduce templates), so an
+    exact-match cache keyed by the source skips parse + walk + compile on hits.
+    With a cache_dir, safe snippets are also persisted as marshalled code objects
+    keyed by SHA-256, so the next process skips validation for them too.
+    Violations are never persisted; they are cheap to re-detect.
+
+    SECURITY: disk entries are trusted as already validated, so cache_dir must
+    only be writable by the host user (it lives under the app data dir).
+
+    Returns:
+        tuple: (code_obj, uses_stdout, None) if the code is safe,
+               (None, False, error_msg) otherwise
+    """
+    if cache_dir is None:
+        return _validate_uncached(code)
+
+    path = _disk_cache_path(code, cache_dir)
+    cached = _disk_cache_load(path)
+    if cached is not None:
+        return cached
+
+    result = _validate_uncached(code)
+    if result[0] is not None:
+        _disk_cache_store(path, result[0], result[1])
+    return result
+
+
+_thread_state = threading.local()
+
+
+def _stdout_buffer() -> io.StringIO:
+    """Return this thread's reusable capture buffer, emptied for the next run."""
+    buf = getattr(_thread_state, "stdout", None)
+    if buf is None:
+        buf = _thread_state.stdout = io.StringIO()
+    else:
+        buf.seek(0)
+        buf.truncate(0)
+    return buf
+
+
+def _capturing_print(buf: io.StringIO):
+    """Build a print() that always writes to buf, whatever file= the snippet passes."""
+    def _print(*args, **kwargs):
+        kwargs["file"] = buf
+        print(*args, **kwargs)
+    return _print
+
+
+# Sentinel: snippet/context not eligible for the JIT path; fall back to exec
+_NO_JIT = object()
+# Compiled Numba kernels keyed by (code, dtype); None marks a failed compile
+_JIT_KERNELS: Dict[Tuple[str, str], Any] = {}
+
+
+class _ContextItemsRewriter(ast.NodeTransformer):
+    """Rewrite context['items'] / context.get('items', ...) into a plain `items` arg."""
+
+    @staticmethod
+    def _is_items_key(node) -> bool:
+        return isinstance(node, ast.Constant) and node.value == 'items'
+
+    def visit_Subscript(self, node):
+        self.generic_visit(node)
+        if (isinstance(node.value, ast.Name) and node.value.id == 'context'
+                and self._is_items_key(node.slice)):
+            return ast.copy_location(ast.Name(id='items', ctx=ast.Load()), node)
+        return node
+
+    def visit_Call(self, node):
+        self.generic_visit(node)
+        func = node.func
+        if (isinstance(func, ast.Attribute) and func.attr == 'get'
+                and isinstance(func.value, ast.Name) and func.value.id == 'context'
+                and node.args and self._is_items_key(node.args[0])):
+            return ast.copy_location(ast.Name(id='items', ctx=ast.Load()), node)
+        return node
+
+
+def _build_jit_kernel(code: str, builtins: dict):
+    """
+    Wrap an already-validated snippet as `def _atp_kernel(items): ...; return result`
+    and hand it to numba.njit. Returns None if the snippet touches any context key
+    other than 'items'.
+    """
+    tree = _ContextItemsRewriter().visit(ast.parse(code))
+    if any(isinstance(n, ast.Name) and n.id == 'context' for n in ast.walk(tree)):
+        return None
+    src = "def _atp_kernel(items):\n" + textwrap.indent(ast.unparse(tree), "    ") + "\n    return result\n"
+    namespace = {"__builtins__": builtins, "math": math}
+    exec(compile(src, "<atp-jit>", "exec"), namespace)
+    return numba.njit(namespace["_atp_kernel"])
+
+
+def _run_jit(code: str, context: Optional[dict], builtins: dict):
+    """
+    Run a numeric snippet through a memoized Numba kernel.
+
+    Only applies when context['items'] coerces to a numeric NumPy array; any
+    typing or compile failure is remembered so the snippet goes straight to
+    exec() next time. Kernels live in-process only: njit(cache=True) needs a
+    source file, which exec-defined kernels do not have.
+    """
+    items = (context or {}).get('items')
+    if not isinstance(items, (list, tuple)) or not items:
+        return _NO_JIT
+    try:
+        arr = np.asarray(items)
+    except Exception:
+        return _NO_JIT
+    if arr.dtype.kind not in 'iuf':
+        return _NO_JIT
+
+    key = (code, arr.dtype.str)
+    kernel = _JIT_KERNELS.get(key, _NO_JIT)
+    if kernel is None:
+        return _NO_JIT
+    try:
+        if kernel is _NO_JIT:
+            kernel = _JIT_KERNELS[key] = _build_jit_kernel(code, builtins)
+            if kernel is None:
+                return _NO_JIT
+        result = kernel(arr)
+    except Exception:
+        _JIT_KERNELS[key] = None
+        return _NO_JIT
+    # Hand back plain Python objects so results stay JSON-serializable
+    if isinstance(result, np.ndarray):
+        return result.tolist()
+    if isinstance(result, np.generic):
+        return result.item()
+    return result
+
 
 class ATPSandbox:
     """
@@ -42,15 +355,20 @@ class ATPSandbox:
     - Context data is untrusted; reads are safe but writes are isolated
     - Caller validates result before using in production contexts
     """
-    def __init__(self):
+    def __init__(self, cache_dir: Optional[Path] = None):
         """
         Initialize sandbox with whitelist of safe builtins.
+
+        Args:
+            cache_dir (Path): Optional directory for the persistent cache of
+                validated code objects; None keeps caching in-process only.
         
         SECURITY RATIONALE:
         - Only specific builtins are exposed (no open, eval, exec, etc.)
         - Prevents all import statements at sandboxed level
         - Whitelist approach: only safe functions explicitly included
         """
+        self.cache_dir = cache_dir
         # The ONLY things the agent's code can see
         self.safe_builtins = {
             'abs': abs, 'all': all, 'any': any, 'ascii': ascii, 'bin': bin, 'bool': bool,
@@ -69,8 +387,17 @@ class ATPSandbox:
             '__doc__': None,
             '__package__': None,
         }
+        # Namespace skeleton copied per call (dict.copy() beats rebuilding a literal)
+        self._globals_template = {
+            "__builtins__": self.safe_builtins,
+            "json": json,
+            "datetime": datetime,
+            "math": math,
+            "context": None,
+            "result": None
+        }
         
-    def execute(self, code: str, context: dict = None):
+    def execute(self, code: str, context: dict = None, jit: bool = False):
         """
         Execute sandboxed code with two-phase security validation.
         
@@ -92,101 +419,57 @@ class ATPSandbox:
         
         Args:
             code (str): Python code to execute in sandbox
-            context (dict): Untrusted data available as 'context' in sandbox
+            context (dict): Untrusted data exposed read-only as 'context' in sandbox
+            jit (bool): Opt-in Numba path for numeric work over context['items']
             
         Returns:
             dict: {"success": bool, "result": ..., "error": ..., "logs": ...}
         """
-        # Capture stdout to prevent protocol pollution
-        stdout_capture = io.StringIO()
-        original_stdout = sys.stdout
-        sys.stdout = stdout_capture
-        
         try:
-            import ast
-            
-            # Phase 1: AST Analysis (Structural Security)
-            try:
-                tree = ast.parse(code)
-            except SyntaxError as e:
-                return {"success": False, "error": f"Syntax Error: {str(e)}"}
-
-            class ATPSecurityVisitor(ast.NodeVisitor):
-                def __init__(self):
-                    self.errors = []
-                    # Expanded forbidden set — blocks class-escape vectors
-                    self.forbidden_names = {
-                        'import', 'eval', 'exec', 'open', 'globals',
-                        'locals', 'input', 'getattr', 'setattr', 'delattr',
-                        'vars', 'dir', 'compile', 'breakpoint',
-                    }
-                    # Forbidden callable names (blocks type() class escape)
-                    self.forbidden_calls = {'type', 'getattr', 'setattr', 'vars', 'dir', 'compile'}
-
-                def visit_Import(self, node):
-                    self.errors.append("Security Violation: 'import' is forbidden.")
-
-                def visit_ImportFrom(self, node):
-                    self.errors.append("Security Violation: 'from ... import' is forbidden.")
-
-                def visit_Name(self, node):
-                    if node.id in self.forbidden_names:
-                        self.errors.append(f"Security Violation: '{node.id}' is forbidden.")
-                    if node.id.startswith('__'):
-                        self.errors.append(f"Security Violation: '{node.id}' (dunder) is forbidden.")
-                    self.generic_visit(node)
-
-                def visit_Attribute(self, node):
-                    if node.attr.startswith('__'):
-                        self.errors.append(f"Security Violation: dunder attribute '{node.attr}' is forbidden.")
-                    self.generic_visit(node)
-
-                def visit_Call(self, node):
-                    # Block dangerous built-in calls that enable class-hierarchy escape
-                    if isinstance(node.func, ast.Name) and node.func.id in self.forbidden_calls:
-                        self.errors.append(f"Security Violation: call to '{node.func.id}()' is forbidden.")
-                    self.generic_visit(node)
-
-            visitor = ATPSecurityVisitor()
-            visitor.visit(tree)
-            
-            if visitor.errors:
-                return {"success": False, "error": visitor.errors[0]}
-
-            # Phase 2: String-based defense (redundancy)
-            dangerous = ['import ', 'eval(', 'exec(', 'open(', 'globals(', '.__']
-            for d in dangerous:
-                if d in code:
-                    return {"success": False, "error": f"Security Violation: Found forbidden pattern '{d}'."}
-
-            safe_globals = {
-                "__builtins__": self.safe_builtins,
-                "json": json,
-                "datetime": datetime,
-                "math": math,
-                "context": context or {},
-                "result": None
-            }
+            if len(code) > MAX_CODE_LEN:
+                return {"success": False, "error": f"Code too large ({len(code)} > {MAX_CODE_LEN} characters)."}
+
+            cache_dir = str(self.cache_dir) if self.cache_dir is not None else None
+            code_obj, uses_stdout, error = _validate_and_compile(code, cache_dir)
+            if error:
+                return {"success": False, "error": error}
+
+            if jit and numba is not None and not uses_stdout:
+                jit_result = _run_jit(code, context, self.safe_builtins)
+                if jit_result is not _NO_JIT:
+                    return {"success": True, "result": jit_result, "logs": ""}
+
+            safe_globals = self._globals_template.copy()
+            # Read-only view: top-level writes raise TypeError inside the sandbox
+            safe_globals["context"] = MappingProxyType(context) if context else _EMPTY_CONTEXT
             
-            # Execute logic
-            exec(code, safe_globals)
+            # Execute logic; capture stdout only if the snippet can print,
+            # to prevent protocol pollution
+            logs = ""
+            if uses_stdout:
+                buf = _stdout_buffer()
+                builtins = self.safe_builtins.copy()
+                builtins["print"] = _capturing_print(buf)
+                safe_globals["__builtins__"] = builtins
+                exec(code_obj, safe_globals)
+                logs = buf.getvalue()
+            else:
+                exec(code_obj, safe_globals)
             
             # Extract result
             result = safe_globals.get("result")
             if result is None:
                 # If no explicit result, return everything custom from locals
-                result = {k: v for k, v in safe_globals.items() if k not in ["__builtins__", "json", "datetime", "math", "context"]}
+                result = {k: v for k, v in safe_globals.items() if k not in _INJECTED_NAMES}
 
             return {
                 "success": True,
                 "result": result,
-                "logs": stdout_capture.getvalue()
+                "logs": logs
             }
             
         except Exception as e:
             return {"success": False, "error": str(e)}
-        finally:
-            sys.stdout = original_stdout
 
 if __name__ == "__main__":
     # Self-test
@@ -1,28 +1,33 @@
 from __future__ import annotations
 import sqlite3
 import hashlib
-import argparse
 from urllib.parse import urlparse
-import urllib.request
-import urllib.error
 import sys
+import importlib
+import importlib.util
+# Document/image parsers are imported on first use (see _optional); None until then
+fitz = None  # PyMuPDF: much faster PDF text extraction than pypdf
+pypdf = None
+openpyxl = None
+docx = None
+Image = None
 try:
-    import pypdf
+    import urllib3
 except ImportError:
-    pypdf = None
+    urllib3 = None
 try:
-    import openpyxl
+    import orjson  # C JSON codec for the stdio protocol loop
 except ImportError:
-    openpyxl = None
-try:
-    import docx
-except ImportError:
-    docx = None
-try:
-    from PIL import Image
-    from PIL.ExifTags import TAGS
-except ImportError:
-    Image = None
+    orjson = None
+def _module_available(name: str) -> bool:
+    """True if `name` could be imported, found without executing it."""
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
+
+# lxml is only probed here; it is the faster BeautifulSoup backend when installed
+_HTML_PARSER = "lxml" if _module_available("lxml") else "html.parser"
 try:
     from watchdog.observers import Observer
     from watchdog.observers.polling import PollingObserver
@@ -31,15 +36,27 @@ except ImportError:
     Observer = None
     PollingObserver = None
     FileSystemEventHandler = None
+try:
+    import watchfiles  # Rust/notify-backed watcher: lower latency and CPU than watchdog polling
+except ImportError:
+    watchfiles = None
 import json
 import logging
 from pathlib import Path
 from typing import Optional, List, Dict, Any
 import datetime
+import html
+import io
 import os
 import re
 import time
 import shlex
+import stat
+import subprocess
+import threading
+from collections import OrderedDict, deque
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
 __version__ = "3.5.0"
 
 logger = logging.getLogger(__name__)
@@ -65,6 +82,7 @@ ALLOWED_PACKAGES: frozenset = frozenset({
     "matplotlib",
     "pillow",
     # Document / file handling
+    "pymupdf",
     "pypdf",
     "openpyxl",
     "python-docx",
@@ -73,9 +91,11 @@ ALLOWED_PACKAGES: frozenset = frozenset({
     "click",
     "rich",
     "tqdm",
+    "orjson",
     "python-dotenv",
     # Filesystem watching
     "watchdog",
+    "watchfiles",
     # Database / ORM
     "sqlalchemy",
     "psycopg2-binary",
@@ -84,6 +104,13 @@ ALLOWED_PACKAGES: frozenset = frozenset({
     "pytest-asyncio",
 })
 
+# Normalised (lowercase, '-' for '_') whitelist, built once for update_dependencies
+_ALLOWED_PACKAGES_NORM: frozenset = frozenset(p.lower().replace("_", "-") for p in ALLOWED_PACKAGES)
+# Non-interactive and quiet: skip pip's self-version check and colour probing
+_PIP_INSTALL_CMD = (sys.executable, "-m", "pip", "install",
+                    "--disable-pip-version-check", "--no-input", "--no-color")
+_PIP_TIMEOUT = 300
+
 try:
     from atp_sandbox import ATPSandbox
     atp_sb = ATPSandbox()
@@ -122,6 +149,350 @@ def inject_nexus_env():
 
 inject_nexus_env()
 
+# Module-global name -> module path for the lazily imported optional parsers
+_OPTIONAL_MODULES = {
+    "fitz": "fitz",
+    "pypdf": "pypdf",
+    "openpyxl": "openpyxl",
+    "docx": "docx",
+    "Image": "PIL.Image",
+}
+_optional_tried: set = set()
+
+def _optional(name: str):
+    """
+    Import an optional dependency on first use and bind it to its module global, so the
+    CLI does not pay for parsers it never touches. Returns the module, or None if missing.
+    """
+    if name not in _optional_tried:
+        _optional_tried.add(name)
+        try:
+            globals()[name] = importlib.import_module(_OPTIONAL_MODULES[name])
+        except ImportError:
+            pass
+    return globals()[name]
+
+# Upper bound on text kept per extracted document; the rest is dropped with a marker
+MAX_EXTRACTED_CHARS = 16 * 1024 * 1024
+
+def _collect_text(chunks, limit: int = MAX_EXTRACTED_CHARS) -> str:
+    """
+    Join streamed text chunks with newlines into a bounded buffer.
+    Stops pulling from the generator once `limit` characters are stored, so
+    large documents are never fully materialised in memory.
+    """
+    buf = io.StringIO()
+    size = -1  # no separator before the first chunk
+    try:
+        for chunk in chunks:
+            chunk = chunk or ""
+            if size >= 0:
+                buf.write("\n")
+            size += 1
+            if size + len(chunk) > limit:
+                buf.write(chunk[:max(limit - size, 0)])
+                buf.write("\n[... truncated ...]")
+                break
+            buf.write(chunk)
+            size += len(chunk)
+    finally:
+        if hasattr(chunks, "close"):
+            chunks.close()  # release the open document early on truncation
+    return buf.getvalue()
+
+# Remote resource reads: shared identity, size cap, and (with urllib3) a pooled client
+_REMOTE_USER_AGENT = 'Nexus-Librarian/1.0 (MCP-Unified-Retrieval)'
+_REMOTE_MAX_BYTES = 1024 * 1024
+# Plain HTTP/1.1 keep-alive; compressed bodies are decoded transparently by urllib3
+_POOL = (urllib3.PoolManager(num_pools=16, maxsize=8,
+                             headers={'User-Agent': _REMOTE_USER_AGENT, 'Accept-Encoding': 'gzip, deflate'})
+         if urllib3 is not None else None)
+
+def _read_capped(response, cap: int = _REMOTE_MAX_BYTES):
+    """
+    Read a response body in 64 KiB chunks into one growing bytearray, stopping at cap.
+    Returns (data, complete) where complete means the body was read to EOF.
+    """
+    buf = bytearray()
+    while True:
+        chunk = response.read(65536)
+        if not chunk:
+            return buf, True
+        buf += chunk
+        if len(buf) >= cap:
+            del buf[cap:]
+            return buf, False
+
+class RemoteTooLarge(OSError):
+    """Raised before reading a remote body whose Content-Length exceeds _REMOTE_MAX_BYTES."""
+
+    def __init__(self, size: int):
+        super().__init__(f"Remote resource too large: {size} bytes")
+        self.size = size
+
+def _check_content_length(headers):
+    """Raise RemoteTooLarge if the advertised body size is over the cap; chunked bodies pass."""
+    try:
+        size = int(headers.get('Content-Length') or 0)
+    except ValueError:
+        return
+    if size > _REMOTE_MAX_BYTES:
+        raise RemoteTooLarge(size)
+
+# Conditional-GET validators for recent remote reads: uri -> (ETag, Last-Modified, body).
+# A 304 reply is answered from here, so an unchanged resource costs a round trip but no body.
+_REMOTE_VALIDATORS = OrderedDict()
+_REMOTE_VALIDATORS_MAX = 64
+_REMOTE_VALIDATOR_MAX_BYTES = 256 * 1024
+
+def _conditional_headers(uri: str) -> Dict[str, str]:
+    entry = _REMOTE_VALIDATORS.get(uri)
+    if entry is None:
+        return {}
+    etag, modified, _ = entry
+    headers = {'If-None-Match': etag} if etag else {}
+    if modified:
+        headers['If-Modified-Since'] = modified
+    return headers
+
+def _not_modified(uri: str) -> bytes:
+    _REMOTE_VALIDATORS.move_to_end(uri)
+    return _REMOTE_VALIDATORS[uri][2]
+
+def _remember_validators(uri: str, headers, data: bytearray):
+    etag, modified = headers.get('ETag'), headers.get('Last-Modified')
+    if (etag or modified) and len(data) <= _REMOTE_VALIDATOR_MAX_BYTES:
+        _REMOTE_VALIDATORS[uri] = (etag, modified, bytes(data))
+        _REMOTE_VALIDATORS.move_to_end(uri)
+        if len(_REMOTE_VALIDATORS) > _REMOTE_VALIDATORS_MAX:
+            _REMOTE_VALIDATORS.popitem(last=False)
+    else:
+        _REMOTE_VALIDATORS.pop(uri, None)
+
+def _fetch_remote(uri: str) -> bytes:
+    """
+    GET at most _REMOTE_MAX_BYTES of uri, reusing pooled keep-alive connections when urllib3
+    is available. Repeat reads revalidate with If-None-Match/If-Modified-Since.
+    """
+    conditional = _conditional_headers(uri)
+    if _POOL is None:
+        # Basic fetch with User-Agent to avoid eager bot blocking
+        import urllib.request  # stdlib fallback; deferred since http.client is slow to import
+        import urllib.error
+        req = urllib.request.Request(uri, headers={'User-Agent': _REMOTE_USER_AGENT, **conditional})
+        try:
+            with urllib.request.urlopen(req, timeout=10) as response:
+                _check_content_length(response.headers)
+                data = _read_capped(response)[0]
+                _remember_validators(uri, response.headers, data)
+                return data
+        except urllib.error.HTTPError as e:
+            if e.code == 304 and conditional:
+                return _not_modified(uri)
+            raise
+    resp = _POOL.request('GET', uri, headers={**_POOL.headers, **conditional},
+                         timeout=urllib3.Timeout(connect=3, read=10),
+                         preload_content=False, decode_content=True)
+    try:
+        if resp.status == 304 and conditional:
+            resp.release_conn()
+            return _not_modified(uri)
+        if resp.status >= 400:
+            raise OSError(f"HTTP Error {resp.status}: {resp.reason}")
+        _check_content_length(resp.headers)
+        data, complete = _read_capped(resp)
+    except BaseException:
+        resp.close()
+        raise
+    if complete:
+        resp.release_conn()  # body fully consumed: the connection can go back to the pool
+    else:
+        resp.close()  # unread remainder: drop the connection rather than drain it
+    _remember_validators(uri, resp.headers, data)
+    return data
+
+# Plain-text files larger than this are not indexed by scan() and only their head is kept by add_link
+MAX_TEXT_BYTES = 4 * 1024 * 1024
+# A NUL byte in this many leading bytes marks a file as binary
+_BINARY_SNIFF_BYTES = 4096
+
+def _stat_sig(st: os.stat_result) -> str:
+    """Cheap change key for a file (size + mtime), stored as links.file_sig to skip re-extraction."""
+    return f"{st.st_size}:{st.st_mtime_ns}"
+
+def _looks_binary(head: bytes) -> bool:
+    return b"\x00" in head[:_BINARY_SNIFF_BYTES]
+
+def _decode_text(raw: bytes) -> str:
+    """Decode file bytes the way text-mode reading would (UTF-8, lenient, universal newlines)."""
+    content = raw.decode('utf-8', errors='ignore')
+    if '\r' in content:
+        content = content.replace('\r\n', '\n').replace('\r', '\n')
+    return content
+
+# EXIF tags worth indexing for images (tag id -> name); everything else is dropped
+_EXIF_KEEP = {306: "DateTime", 271: "Make", 272: "Model", 274: "Orientation", 34853: "GPSInfo"}
+
+# Documents up to this size are read in one go and parsed from memory
+MAX_IN_MEMORY_DOC_BYTES = 50 * 1024 * 1024
+
+def _buffered_source(path: Path):
+    """
+    Return the file as a BytesIO when it is small enough, so parsers seek and read
+    from memory instead of issuing many small reads; larger files stay path-based.
+    """
+    try:
+        if path.stat().st_size <= MAX_IN_MEMORY_DOC_BYTES:
+            return io.BytesIO(path.read_bytes())
+    except OSError:
+        pass
+    return path
+
+# Pages extracted per PDF; later pages are dropped with a marker
+MAX_PDF_PAGES = 2000
+
+def _extract_pdf(path: Path):
+    """Yield PDF text one page at a time (up to MAX_PDF_PAGES), preferring PyMuPDF over pypdf."""
+    if _optional("fitz") is not None:
+        doc = fitz.open(path)
+        try:
+            total = doc.page_count
+            for i in range(min(total, MAX_PDF_PAGES)):
+                yield doc[i].get_text()
+        finally:
+            doc.close()
+    else:
+        pages = _optional("pypdf").PdfReader(_buffered_source(path)).pages
+        total = len(pages)
+        for i in range(min(total, MAX_PDF_PAGES)):
+            yield pages[i].extract_text()
+    if total > MAX_PDF_PAGES:
+        yield f"[... truncated after {MAX_PDF_PAGES} of {total} pages ...]"
+
+# Rows read per worksheet; the rest of a sheet is dropped with a marker
+MAX_XLSX_ROWS = 10_000
+
+def _extract_xlsx(path: Path):
+    """Yield a header per sheet followed by its non-empty rows (streamed via read_only mode)."""
+    wb = openpyxl.load_workbook(_buffered_source(path), read_only=True, data_only=True, keep_links=False)
+    try:
+        for sheet in wb.sheetnames:
+            ws = wb[sheet]
+            yield f"Sheet: {sheet}"
+            for i, row in enumerate(ws.iter_rows(values_only=True)):
+                if i == MAX_XLSX_ROWS:
+                    yield f"[... sheet truncated after {MAX_XLSX_ROWS} rows ...]"
+                    break
+                row_text = " ".join([str(c) for c in row if c is not None])
+                if row_text:
+                    yield row_text
+    finally:
+        wb.close()
+
+def _extract_docx(path: Path):
+    """Yield paragraph text from a Word document."""
+    doc = docx.Document(path)
+    for p in doc.paragraphs:
+        yield p.text
+
+def _extract_image(path: Path):
+    """Yield basic image properties, then the curated EXIF fields if any are present."""
+    with Image.open(path) as img:
+        yield f"Format: {img.format}"
+        yield f"Mode: {img.mode}"
+        yield f"Size: {img.size[0]}x{img.size[1]}"
+        raw_exif = img.getexif()
+        exif = [f"{name}={raw_exif[tag]}" for tag, name in _EXIF_KEEP.items() if tag in raw_exif]
+        if exif:
+            yield f"EXIF: {'; '.join(exif)}"
+
+# Document extractors by file suffix: (label for warnings, optional module it needs, extractor).
+# A suffix whose module is missing falls back to add_link's plain-text handling.
+_EXTRACTORS = {
+    ".pdf": ("PDF", None, _extract_pdf),  # needs fitz or pypdf; failures are logged
+    ".xlsx": ("Excel", "openpyxl", _extract_xlsx),
+    ".docx": ("Word", "docx", _extract_docx),
+    **{ext: ("Image", "Image", _extract_image) for ext in (".jpg", ".jpeg", ".png", ".gif", ".bmp")},
+}
+
+# Byte-level matchers for the common case of a plain <title> and description <meta>
+_TITLE_RE = re.compile(rb'<title[^>]*>([^<]{1,512})</title>', re.I)
+_META_DESC_RE = re.compile(rb'<meta\s[^>]*name\s*=\s*["\']?description["\'\s/>][^>]*>', re.I)
+_CONTENT_ATTR_RE = re.compile(rb'content\s*=\s*(["\'])(.*?)\1', re.I | re.S)
+_DESCRIPTION_RE = re.compile(rb'description', re.I)
+
+def _quick_html_metadata(head: bytes, encoding: Optional[str]):
+    """
+    Pull (title, description) out of an HTML head with regexes alone, or return None
+    when the markup is unusual enough to need a real parser.
+    """
+    title = _TITLE_RE.search(head)
+    if title is None:
+        return None
+    meta = _META_DESC_RE.search(head)
+    if meta is not None:
+        content = _CONTENT_ATTR_RE.search(meta.group(0))
+        if content is None:
+            return None
+        description = content.group(2)
+    elif _DESCRIPTION_RE.search(head):
+        return None  # e.g. content= before name=: let the parser sort it out
+    else:
+        description = b""
+    enc = encoding or "utf-8"
+    return (html.unescape(title.group(1).decode(enc, "replace")).strip(),
+            html.unescape(description.decode(enc, "replace")))
+
+@lru_cache(maxsize=1024)
+def _parse_url(url: str):
+    """urlparse() memoized for URLs that are validated, fetched and stored in one add."""
+    return urlparse(url)
+
+def _json_dumps_bytes(obj) -> bytes:
+    """Serialize one protocol message, using orjson when it is installed."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            pass  # e.g. integers beyond 64 bits; the stdlib encoder handles those
+    return json.dumps(obj).encode()
+
+@lru_cache(maxsize=1)
+def _health_text() -> str:
+    """
+    Optional-dependency status for check_health, probed without importing anything.
+    Cached; update_dependencies clears it after an install so new packages show up.
+    """
+    if orjson is not None:
+        orjson_status = '✅'
+    elif _module_available('orjson'):
+        orjson_status = '✅ installed, used after a restart'  # the protocol codec is bound at import
+    else:
+        orjson_status = '➖ optional, faster protocol I/O (pip install orjson)'
+    return "\n".join([
+        f"PyMuPDF: {'✅' if _module_available('fitz') else '➖ optional, faster PDFs (pip install pymupdf)'}",
+        f"pypdf: {'✅' if _module_available('pypdf') else '❌ (pip install pypdf)'}",
+        f"openpyxl: {'✅' if _module_available('openpyxl') else '❌ (pip install openpyxl)'}",
+        f"python-docx: {'✅' if _module_available('docx') else '❌ (pip install python-docx)'}",
+        f"orjson: {orjson_status}",
+        f"Pillow: {'✅' if _module_available('PIL') else '❌ (pip install Pillow)'}",
+    ])
+
+# orjson.JSONDecodeError subclasses json.JSONDecodeError, so callers catch either the same way
+_json_loads = orjson.loads if orjson is not None else json.loads
+
+def _fts_match_query(search: str) -> Optional[str]:
+    """
+    Turn free-text input into a safe FTS5 MATCH expression: every whitespace
+    separated term becomes a quoted prefix phrase (implicitly AND-ed), so user
+    input can never be parsed as FTS syntax. Returns None when the input has
+    no word characters, leaving the caller to fall back to LIKE.
+    """
+    terms = [t for t in search.split() if re.search(r"\w", t)]
+    if not terms:
+        return None
+    return " ".join('"' + t.replace('"', '""') + '"*' for t in terms)
+
 class SecureMcpLibrary:
     """
     Secure Multi-Contextual Processor (MCP) Link Library
@@ -130,6 +501,9 @@ class SecureMcpLibrary:
     
     app_dir: Path
 
+    # Accepted values for the MCP_SQLITE_SYNC override (interpolated into a PRAGMA, so whitelisted)
+    _SYNC_MODES = ("OFF", "NORMAL", "FULL", "EXTRA")
+
     def __init__(self, db_path: str = None, *, allow_http: bool = False):
         # Stable data dir: ~/.mcp-tools/mcpinv/librarian/
         # Lives inside the ONE portable root. Never inside a git/code directory.
@@ -178,8 +552,27 @@ class SecureMcpLibrary:
                         print(f"⚠️  DB migration skipped: {_me}")
                     break
 
-        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        # Room for every distinct statement this class issues, so none is re-prepared
+        self.conn = sqlite3.connect(db_path, check_same_thread=False, cached_statements=256)
+        # 8 KiB pages halve the overflow chains of large content rows. Only takes effect on a
+        # brand-new database, so it must run before WAL mode or any table is created.
+        self.conn.execute("PRAGMA page_size = 8192")
+        # WAL + relaxed fsync: bulk indexing pays one group commit instead of one per row.
+        # MCP_SQLITE_SYNC=FULL (or EXTRA) restores an fsync per commit for paranoid deployments.
+        if db_path != ":memory:":
+            self.conn.execute("PRAGMA journal_mode = WAL")
+        sync = (os.environ.get("MCP_SQLITE_SYNC") or "NORMAL").strip().upper()
+        if sync not in self._SYNC_MODES:
+            print(f"⚠️  Ignoring MCP_SQLITE_SYNC={sync!r}; expected one of {', '.join(self._SYNC_MODES)}", file=sys.stderr)
+            sync = "NORMAL"
+        self.conn.execute(f"PRAGMA synchronous = {sync}")
+        self.conn.execute("PRAGMA temp_store = MEMORY")
+        self.conn.execute("PRAGMA cache_size = -65536")
+        self.conn.execute("PRAGMA mmap_size = 268435456")
+        # INSERT OR REPLACE must fire DELETE triggers so the FTS index drops replaced rows
+        self.conn.execute("PRAGMA recursive_triggers = ON")
         self.cursor = self.conn.cursor()
+        self.fts_enabled = False
         self._create_secure_tables()
     
     def _create_secure_tables(self):
@@ -196,7 +589,8 @@ class SecureMcpLibrary:
                 is_active BOOLEAN DEFAULT 1,
                 created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
                 hash TEXT,
-                content TEXT
+                content TEXT,
+                file_sig TEXT
             )
         ''')
         self.cursor.execute('''
@@ -219,9 +613,171 @@ class SecureMcpLibrary:
             self.conn.commit()
         except Exception:
             pass  # Column already exists
+        # Migrate existing DBs: add file_sig column if absent (unchanged-file detection)
+        try:
+            self.cursor.execute("ALTER TABLE links ADD COLUMN file_sig TEXT")
+            self.conn.commit()
+        except Exception:
+            pass  # Column already exists
+        # Legacy rows may carry a NULL stack; normalise once so stack filters can compare
+        # the bare column (no COALESCE) and use the (is_active, stack) index below
+        self.cursor.execute("UPDATE links SET stack = 'default' WHERE stack IS NULL")
+        self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_links_active_stack ON links(is_active, stack)")
+        # file_sig sits after the content blob in each row, so reading it from the table walks
+        # the blob's overflow pages; this covering index serves index_directory's lookup instead
+        self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_links_file_sig ON links(is_active, url, file_sig) "
+                            "WHERE file_sig IS NOT NULL")
+        self.conn.commit()
+        self._create_category_tables()
+        self._create_fts_index()
+
+    def _create_category_tables(self):
+        """
+        Normalize the comma-separated links.categories column into an indexed
+        junction table so category filters are B-tree lookups, not LIKE scans.
+        The CSV column is kept (get_categories needs its ordering) and is the
+        source that _sync_categories() mirrors from.
+        """
+        self.cursor.executescript('''
+            CREATE TABLE IF NOT EXISTS categories (
+                id INTEGER PRIMARY KEY,
+                name TEXT UNIQUE NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS link_categories (
+                link_id INTEGER NOT NULL,
+                category_id INTEGER NOT NULL,
+                PRIMARY KEY (link_id, category_id)
+            );
+            CREATE INDEX IF NOT EXISTS idx_link_categories_category
+                ON link_categories(category_id, link_id);
+            CREATE TRIGGER IF NOT EXISTS links_categories_ad AFTER DELETE ON links BEGIN
+                DELETE FROM link_categories WHERE link_id = old.id;
+            END;
+        ''')
+        # One-shot migration for databases that predate the junction table
+        unsynced = self.cursor.execute(
+            "SELECT 1 FROM links WHERE categories IS NOT NULL "
+            "AND NOT EXISTS (SELECT 1 FROM link_categories) LIMIT 1"
+        ).fetchone()
+        if unsynced:
+            self._sync_categories("1=1")
+        self.conn.commit()
+
+    def _sync_categories(self, where: str, params=()):
+        """Rebuild link_categories rows for the links matching `where` from their CSV column."""
+        rows = self.conn.execute(f"SELECT id, categories FROM links WHERE {where}", params).fetchall()
+        if not rows:
+            return
+        pairs = [
+            (link_id, name)
+            for link_id, cats in rows
+            for name in {c.strip() for c in (cats or "").split(",") if c.strip()}
+        ]
+        self.conn.executemany("DELETE FROM link_categories WHERE link_id = ?", [(r[0],) for r in rows])
+        self.conn.executemany("INSERT OR IGNORE INTO categories(name) VALUES (?)", {(n,) for _, n in pairs})
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO link_categories(link_id, category_id) "
+            "SELECT ?, id FROM categories WHERE name = ?",
+            pairs,
+        )
+
+    def _sync_categories_for_urls(self, urls: List[str]):
+        """_sync_categories() for a batch of URLs, chunked under SQLite's host-parameter limit."""
+        for i in range(0, len(urls), 500):
+            chunk = urls[i:i + 500]
+            self._sync_categories(f"url IN ({','.join('?' * len(chunk))})", chunk)
+
+    # FTS sync triggers, executed one by one: executescript() would commit an open transaction
+    _FTS_TRIGGERS = (
+        """CREATE TRIGGER IF NOT EXISTS links_fts_ai AFTER INSERT ON links BEGIN
+            INSERT INTO links_fts(rowid, title, url, description, content)
+            VALUES (new.id, new.title, new.url, new.description, new.content);
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS links_fts_ad AFTER DELETE ON links BEGIN
+            INSERT INTO links_fts(links_fts, rowid, title, url, description, content)
+            VALUES ('delete', old.id, old.title, old.url, old.description, old.content);
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS links_fts_au AFTER UPDATE ON links BEGIN
+            INSERT INTO links_fts(links_fts, rowid, title, url, description, content)
+            VALUES ('delete', old.id, old.title, old.url, old.description, old.content);
+            INSERT INTO links_fts(rowid, title, url, description, content)
+            VALUES (new.id, new.title, new.url, new.description, new.content);
+        END""",
+    )
+    # Bulk writes of at least this many rows may swap per-row FTS triggers for one rebuild
+    _FTS_BULK_MIN = 200
+
+    def _create_fts_index(self):
+        """
+        Mirror searchable columns into an external-content FTS5 table kept in sync
+        by triggers, so searches avoid full-table LIKE scans over file content.
+        Falls back to LIKE search when this SQLite build lacks FTS5.
+        """
+        existing = self.cursor.execute(
+            "SELECT sql FROM sqlite_master WHERE type='table' AND name='links_fts'"
+        ).fetchone()
+        existed = existing is not None
+        try:
+            if existed and "remove_diacritics 2" not in existing[0]:
+                # Built before accent folding: the index is derived data, so recreate it
+                self.cursor.execute("DROP TABLE links_fts")
+                existed = False
+            # remove_diacritics 2 folds accents (café matches cafe), including combining marks
+            self.cursor.execute('''
+                CREATE VIRTUAL TABLE IF NOT EXISTS links_fts USING fts5(
+                    title, url, description, content,
+                    content='links', content_rowid='id',
+                    tokenize='unicode61 remove_diacritics 2'
+                )
+            ''')
+            for sql in self._FTS_TRIGGERS:
+                self.cursor.execute(sql)
+        except sqlite3.OperationalError as e:
+            logger.warning(f"FTS5 unavailable, falling back to LIKE search: {e}")
+            return
+        if not existed:
+            # One-shot migration: index rows that predate the FTS table
+            self.cursor.execute("INSERT INTO links_fts(links_fts) VALUES ('rebuild')")
+        self.conn.commit()
+        self.fts_enabled = True
+
+    def _fts_bulk_worthwhile(self, rows: int) -> bool:
+        """
+        True when a bulk write of `rows` should drop the FTS triggers and rebuild once.
+        A rebuild re-tokenizes the whole table, so it only pays off when the batch is
+        large and makes up at least half of it (first scans, big imports).
+        """
+        if not self.fts_enabled or rows < self._FTS_BULK_MIN:
+            return False
+        total = self.conn.execute("SELECT count(*) FROM links").fetchone()[0]
+        return rows * 2 >= total
+
+    def _suspend_fts_triggers(self):
+        """
+        Drop the FTS sync triggers; call _rebuild_fts_index() before the transaction commits.
+        Only for writers that own the connection for the whole transaction (index_directory):
+        a commit from another thread in between would persist the schema without triggers.
+        """
+        if not self.conn.in_transaction:
+            # DDL does not open an implicit transaction; without one the drop would autocommit
+            self.conn.execute("BEGIN")
+        for name in ("links_fts_ai", "links_fts_ad", "links_fts_au"):
+            self.conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+
+    def _rebuild_fts_index(self):
+        """Re-index links_fts from the table and restore the sync triggers."""
+        self.conn.execute("INSERT INTO links_fts(links_fts) VALUES ('rebuild')")
+        for sql in self._FTS_TRIGGERS:
+            self.conn.execute(sql)
     
-    def add_link(self, url: str, categories: List[str] = None, stack: str = "default"):
-        """Add a new link with secure metadata extraction."""
+    _ADD_LINK_SQL = '''
+        INSERT OR REPLACE INTO links
+        (url, title, domain, description, categories, stack, is_active, hash, content, file_sig)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    '''
+
+    def add_link(self, url: str, categories: List[str] = None, stack: str = "default", *, commit: bool = True):
+        """Add a new link with secure metadata extraction. commit=False leaves the transaction open for batching."""
         validated_url = self._validate_url(url)
         url_hash = hashlib.sha256(validated_url.encode()).hexdigest()
         
@@ -230,65 +786,37 @@ class SecureMcpLibrary:
         
         # Try to read content for indexing
         content = None
+        file_sig = None
         if validated_url.startswith("file://"):
              try:
                  path = Path(validated_url.replace("file://", "")).resolve()
-                 if path.exists():
-                     if path.suffix.lower() == '.pdf':
+                 try:
+                     file_sig = _stat_sig(path.stat())
+                 except OSError:
+                     pass
+                 # Same size and mtime as the stored row: reuse its content instead of re-extracting.
+                 # Rows without content are retried, since a parser may have been installed since.
+                 cached = file_sig and self.conn.execute(
+                     "SELECT content FROM links WHERE url = ? AND file_sig = ? AND content IS NOT NULL",
+                     (validated_url, file_sig)
+                 ).fetchone()
+                 if cached:
+                     content = cached[0]
+                 elif file_sig:
+                     extractor = _EXTRACTORS.get(path.suffix.lower())
+                     if extractor and (extractor[1] is None or _optional(extractor[1])):
+                         label, _, extract = extractor
                          try:
-                             reader = pypdf.PdfReader(path)
-                             text = []
-                             for page in reader.pages:
-                                 text.append(page.extract_text())
-                             content = "\n".join(text)
+                             content = _collect_text(extract(path))
                          except Exception as e:
-                             print(f"⚠️  PDF extraction failed for {path}: {e}", file=sys.stderr)
-                             content = None
-                     elif path.suffix.lower() == '.xlsx' and openpyxl:
-                         try:
-                            wb = openpyxl.load_workbook(path, data_only=True)
-                            text = []
-                            for sheet in wb.sheetnames:
-                                ws = wb[sheet]
-                                text.append(f"Sheet: {sheet}")
-                                for row in ws.iter_rows(values_only=True):
-                                    row_text = " ".join([str(c) for c in row if c is not None])
-                                    if row_text:
-                                        text.append(row_text)
-                            content = "\n".join(text)
-                         except Exception as e:
-                            print(f"⚠️  Excel extraction failed for {path}: {e}", file=sys.stderr)
-                            content = None
-                     elif path.suffix.lower() == '.docx' and docx:
-                         try:
-                             doc = docx.Document(path)
-                             content = "\n".join([p.text for p in doc.paragraphs])
-                         except Exception as e:
-                             print(f"⚠️  Word extraction failed for {path}: {e}", file=sys.stderr)
-                             content = None
-                     elif path.suffix.lower() in ['.jpg', '.jpeg', '.png', '.gif', '.bmp'] and Image:
-                         try:
-                             with Image.open(path) as img:
-                                 meta = [
-                                     f"Format: {img.format}",
-                                     f"Mode: {img.mode}",
-                                     f"Size: {img.size[0]}x{img.size[1]}",
-                                 ]
-                                 if hasattr(img, '_getexif') and img._getexif():
-                                     exif = {
-                                         TAGS.get(k, k): v
-                                         for k, v in img._getexif().items()
-                                         if k in TAGS
-                                     }
-                                     meta.append(f"EXIF: {str(exif)}")
-                                 content = "\n".join(meta)
-                         except Exception as e:
-                             print(f"⚠️  Image extraction failed for {path}: {e}", file=sys.stderr)
+                             print(f"⚠️  {label} extraction failed for {path}: {e}", file=sys.stderr)
                              content = None
                      else:
-                        # Text Handling
+                        # Text Handling: bounded read, binary files get no content
                         try:
-                            content = path.read_text(errors='ignore')
+                            with open(path, 'rb') as f:
+                                raw = f.read(MAX_TEXT_BYTES)
+                            content = None if _looks_binary(raw) else _decode_text(raw)
                         except OSError as e:
                             logger.error(f"OS error: {e}", exc_info=True)
                             pass
@@ -298,11 +826,10 @@ class SecureMcpLibrary:
         elif validated_url.startswith(("http://", "https://")):
             # NEW: Remote content indexing for web resources
             try:
-                import requests
                 from bs4 import BeautifulSoup
-                resp = requests.get(validated_url, timeout=10)
+                resp = self._http_session().get(validated_url, timeout=(3, 10))
                 if resp.ok:
-                    soup = BeautifulSoup(resp.text, 'html.parser')
+                    soup = BeautifulSoup(resp.text, _HTML_PARSER)
                     # Remove script and style elements
                     for script in soup(["script", "style"]):
                         script.decompose()
@@ -311,11 +838,7 @@ class SecureMcpLibrary:
                 logger.error(f"Remote indexing failed for {validated_url}: {e}")
                 content = None
 
-        self.cursor.execute('''
-            INSERT OR REPLACE INTO links
-            (url, title, domain, description, categories, stack, is_active, hash, content)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
+        self.cursor.execute(self._ADD_LINK_SQL, (
             validated_url,
             metadata['title'],
             metadata['domain'],
@@ -324,35 +847,88 @@ class SecureMcpLibrary:
             stack or 'default',
             1,
             url_hash,
-            content
+            content,
+            file_sig
         ))
-        self.conn.commit()
-        return self.cursor.lastrowid
+        link_id = self.cursor.lastrowid
+        self._sync_categories("id = ?", (link_id,))
+        if commit:
+            self.conn.commit()
+        return link_id
+
+    # Selectable list_links() columns, in their default output order
+    _LINK_COLUMNS = {
+        "id": "links.id",
+        "url": "links.url",
+        "title": "links.title",
+        "domain": "links.domain",
+        "categories": "links.categories",
+        "is_active": "links.is_active",
+        "stack": "links.stack",
+    }
 
-    def list_links(self, category: str = None, search: str = None, only_active: bool = True, stack: str = None):
-        """List links with optional filtering. Returns (id, url, title, domain, categories, is_active, stack)."""
-        query = "SELECT id, url, title, domain, categories, is_active, COALESCE(stack,'default') FROM links WHERE 1=1"
-        params = []
+    def _links_query(self, columns, category, search, only_active, stack):
+        """Build the filtered SELECT behind list_links()/count_links(). Returns (query, params, ranked)."""
+        unknown = [c for c in columns if c not in self._LINK_COLUMNS]
+        if unknown:
+            raise ValueError(f"Unknown link column(s): {', '.join(unknown)}")
+        fts_query = _fts_match_query(search) if search and self.fts_enabled else None
+        select = ", ".join(self._LINK_COLUMNS[c] for c in columns)
+        if fts_query:
+            # Ranked full-text match via the FTS5 index
+            query = f"SELECT {select} FROM links JOIN links_fts ON links_fts.rowid = links.id WHERE links_fts MATCH ?"
+            params = [fts_query]
+        else:
+            query = f"SELECT {select} FROM links WHERE 1=1"
+            params = []
         
         if only_active:
-            query += " AND is_active = 1"
+            query += " AND links.is_active = 1"
         if category:
-            query += " AND categories LIKE ?"
-            params.append(f"%{category}%")
-        if search:
-            query += " AND (title LIKE ? OR url LIKE ? OR description LIKE ? OR content LIKE ?)"
+            # Comma-separated input ('file,code') requires every listed category
+            names = sorted({c.strip() for c in category.split(",") if c.strip()})
+            query += (
+                " AND links.id IN (SELECT lc.link_id FROM link_categories lc"
+                " JOIN categories c ON c.id = lc.category_id"
+                f" WHERE c.name IN ({','.join('?' * len(names))})"
+                " GROUP BY lc.link_id HAVING COUNT(*) = ?)"
+            )
+            params.extend(names)
+            params.append(len(names))
+        if search and not fts_query:
+            query += " AND (links.title LIKE ? OR links.url LIKE ? OR links.description LIKE ? OR links.content LIKE ?)"
             params.extend([f"%{search}%", f"%{search}%", f"%{search}%", f"%{search}%"])
         if stack:
-            query += " AND COALESCE(stack,'default') = ?"
+            query += " AND links.stack = ?"
             params.append(stack)
+        return query, params, fts_query is not None
+
+    def list_links(self, category: str = None, search: str = None, only_active: bool = True, stack: str = None,
+                   limit: Optional[int] = None, offset: int = 0, columns: tuple = tuple(_LINK_COLUMNS)):
+        """
+        List links with optional filtering. Returns (id, url, title, domain, categories, is_active, stack)
+        by default; pass `columns` (names from _LINK_COLUMNS) to fetch fewer, and `limit`/`offset` to page in SQL.
+        """
+        query, params, ranked = self._links_query(columns, category, search, only_active, stack)
+        if ranked:
+            query += " ORDER BY bm25(links_fts)"
+        if limit is not None or offset:
+            query += " LIMIT ? OFFSET ?"
+            params.extend([-1 if limit is None else limit, offset])
 
         self.cursor.execute(query, params)
         return self.cursor.fetchall()
 
+    def count_links(self, category: str = None, search: str = None, only_active: bool = True, stack: str = None) -> int:
+        """Number of rows list_links() would return for the same filters."""
+        query, params, _ = self._links_query(("id",), category, search, only_active, stack)
+        self.cursor.execute(f"SELECT COUNT(*) FROM ({query})", params)
+        return self.cursor.fetchone()[0]
+
     def list_stacks(self) -> List[str]:
         """Return all distinct stack names that have at least one active resource."""
         self.cursor.execute(
-            "SELECT DISTINCT COALESCE(stack,'default') FROM links WHERE is_active=1 ORDER BY 1"
+            "SELECT DISTINCT stack FROM links WHERE is_active=1 ORDER BY 1"
         )
         return [row[0] for row in self.cursor.fetchall()]
 
@@ -365,7 +941,7 @@ class SecureMcpLibrary:
         query = "SELECT categories, COUNT(*) as cnt FROM links WHERE is_active=1"
         params = []
         if stack:
-            query += " AND COALESCE(stack,'default') = ?"
+            query += " AND stack = ?"
             params.append(stack)
         query += " GROUP BY categories"
         self.cursor.execute(query, params)
@@ -411,6 +987,8 @@ class SecureMcpLibrary:
             
         params.append(link_id)
         self.cursor.execute(f"UPDATE links SET {', '.join(updates)} WHERE id = ?", params)
+        if categories:
+            self._sync_categories("id = ?", (link_id,))
         self.conn.commit()
         return True
 
@@ -420,15 +998,22 @@ class SecureMcpLibrary:
         self.conn.commit()
         return True
 
-    def open_resource(self, link_id: int):
-        """Open a resource using the OS default handler."""
-        self.cursor.execute("SELECT url FROM links WHERE id = ?", (link_id,))
-        row = self.cursor.fetchone()
+    def _fetch_link(self, link_id: int, columns: tuple = ("url",)) -> Dict[str, Any]:
+        """Fetch the named _LINK_COLUMNS of one link in a single query; ValueError if it doesn't exist."""
+        unknown = [c for c in columns if c not in self._LINK_COLUMNS]
+        if unknown:
+            raise ValueError(f"Unknown link column(s): {', '.join(unknown)}")
+        row = self.conn.execute(
+            f"SELECT {', '.join(self._LINK_COLUMNS[c] for c in columns)} FROM links WHERE links.id = ?",
+            (link_id,),
+        ).fetchone()
         if not row:
             raise ValueError(f"Resource {link_id} not found")
-        
-        url = row[0]
-        import subprocess
+        return dict(zip(columns, row))
+
+    def open_resource(self, link_id: int):
+        """Open a resource using the OS default handler."""
+        url = self._fetch_link(link_id)["url"]
         
         if url.startswith("file://"):
             path = url.replace("file://", "")
@@ -453,17 +1038,11 @@ class SecureMcpLibrary:
 
     def edit_resource(self, link_id: int):
         """Open a file resource in the default editor."""
-        self.cursor.execute("SELECT url FROM links WHERE id = ?", (link_id,))
-        row = self.cursor.fetchone()
-        if not row:
-            raise ValueError(f"Resource {link_id} not found")
-        
-        url = row[0]
+        url = self._fetch_link(link_id)["url"]
         if not url.startswith("file://"):
             return False # Can't edit remote URLs or pseudo-protocols
             
         path = url.replace("file://", "")
-        import subprocess
         
         editor = os.environ.get("EDITOR", "open -e" if sys.platform == "darwin" else "notepad" if sys.platform == "win32" else "vi")
         
@@ -484,7 +1063,7 @@ class SecureMcpLibrary:
             raise ValueError(
                 f"Insecure URL scheme blocked: {url}. Use https:// or pass --allow-http if you really need plain HTTP."
             )
-        parsed = urlparse(url)
+        parsed = _parse_url(url)
         
         # Files can have empty netloc (file:///path), HTTP must have domain
         if not parsed.netloc and not url.startswith("file://"):
@@ -492,70 +1071,141 @@ class SecureMcpLibrary:
             raise ValueError(f"Invalid URL: {url}")
         return url
     
+    MAX_METADATA_BYTES = 512 * 1024
+
+    def _http_session(self):
+        """
+        Lazily create one pooled requests.Session for this library, so repeated fetches
+        reuse keep-alive connections instead of a new TCP/TLS handshake per URL.
+        """
+        session = getattr(self, "_session", None)
+        if session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            session = requests.Session()
+            session.headers["User-Agent"] = f"mcp-link-library/{__version__}"
+            adapter = HTTPAdapter(pool_connections=16, pool_maxsize=16, max_retries=1)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            self._session = session
+        return session
+
     def _extract_link_metadata(self, url: str):
         """
         Extract title and description from URL.
         Uses requests for the fetch and BeautifulSoup for parsing the HTML DOM.
         """
+        parsed = _parse_url(url)
         try:
             import requests
             from bs4 import BeautifulSoup
         except ImportError:
             print("⚠️  Dependencies 'requests' or 'beautifulsoup4' not found.")
             print("   Run 'python3 mcp.py --bootstrap' or 'pip install requests beautifulsoup4'")
-            return {'title': url, 'domain': urlparse(url).netloc, 'description': 'Scraper dependencies missing'}
+            return {'title': url, 'domain': parsed.netloc, 'description': 'Scraper dependencies missing'}
+
+        # Fallback for unreachable or non-HTML resources
+        fallback = {'title': url, 'domain': parsed.netloc, 'description': 'Metadata extraction failed'}
+        if parsed.scheme not in ('http', 'https'):
+            return fallback  # e.g. file:// links: nothing to fetch over HTTP
 
         try:
-            # Set a 5s timeout to prevent hanging on slow servers
-            response = requests.get(url, timeout=5)
-            soup = BeautifulSoup(response.text, 'html.parser')
+            # Set a 5s timeout to prevent hanging on slow servers, and only read the
+            # head of the body: <title> and <meta> live there, not in a 100 MB page.
+            # The Range header lets servers that honour it send just that much.
+            headers = {'Range': f'bytes=0-{self.MAX_METADATA_BYTES - 1}'}
+            with self._http_session().get(url, timeout=(3, 5), stream=True, headers=headers) as response:
+                head = response.raw.read(self.MAX_METADATA_BYTES, decode_content=True)
+            # Only trust a declared charset; requests assumes ISO-8859-1 for any text/* without one
+            encoding = response.encoding if 'charset' in response.headers.get('Content-Type', '').lower() else None
+            quick = _quick_html_metadata(head, encoding)
+            if quick is not None:
+                return {'title': quick[0] or url, 'domain': parsed.netloc, 'description': quick[1]}
+            soup = BeautifulSoup(head, _HTML_PARSER, from_encoding=encoding)
             
-            # Extract title, fall back to URL if <title> tag is missing
-            title_tag = soup.title.string if soup.title else url
+            # One pass over the <meta> tags: name= and Open Graph property= keys, first wins
+            metas = {}
+            for tag in soup.find_all('meta', limit=64):
+                key = tag.get('name') or tag.get('property')
+                if key:
+                    metas.setdefault(key.lower(), tag.get('content', ''))
+            # Extract title (then og:title), fall back to URL if neither is present
+            title_tag = soup.title
+            title = title_tag.string.strip() if title_tag and title_tag.string else ''
             
             return {
-                'title': title_tag.strip() if title_tag else url,
-                'domain': urlparse(url).netloc,
-                # Try to find the standard SEO description meta tag
-                'description': (
-                    soup.find('meta', attrs={'name': 'description'}).get('content', '') 
-                    if soup.find('meta', attrs={'name': 'description'}) 
-                    else ''
-                )
+                'title': title or metas.get('og:title') or url,
+                'domain': parsed.netloc,
+                'description': metas.get('description', metas.get('og:description', ''))
             }
         except Exception:
-            # Fallback for unreachable or non-HTML resources
-            return {
-                'title': url,
-                'domain': urlparse(url).netloc,
-                'description': 'Metadata extraction failed'
-            }
+            return fallback
+
+    _INSERT_LINK_SQL = '''
+        INSERT OR REPLACE INTO links 
+        (url, title, domain, description, categories, is_active, hash, content) 
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    '''
+    _INSERT_FILE_SQL = '''
+        INSERT OR REPLACE INTO links
+        (url, title, domain, description, categories, is_active, hash, content, file_sig)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    '''
+    # Rows buffered per executemany() call during bulk indexing
+    _BATCH_SIZE = 500
 
     def index_directory(self, path: str):
         """Index a local directory into the knowledge base."""
         indexer = FileIndexer(path)
         count = 0
         print(f"📂 Indexing {path}...")
-        for file_data in indexer.scan():
-            self.cursor.execute('''
-                INSERT OR REPLACE INTO links 
-                (url, title, domain, description, categories, is_active, hash, content) 
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                f"file://{file_data['path']}", 
-                file_data['name'], 
-                'local-file', 
-                f"Local file: {file_data['rel_path']}", 
-                'file,code', 
-                1,
-                file_data['hash'],
-                file_data['content']
-            ))
-            count += 1
-            if count % 10 == 0:
-                print(f"   Indexed {count} files...", end='\r')
-        self.conn.commit()
-        print(f"✅ Indexed {count} files.")
+        # Active file rows whose size+mtime still match are skipped without being read
+        known = {
+            url[len("file://"):]: sig for url, sig in self.conn.execute(
+                "SELECT url, file_sig FROM links WHERE file_sig IS NOT NULL AND is_active = 1")
+        }
+        # In-place progress is for terminals only, and at most ~10 updates a second
+        show_progress = sys.stdout.isatty()
+        next_progress = 0.0
+        batch = []
+        fts_suspended = False
+        # One transaction for the whole scan; rows are flushed in batches. IMMEDIATE takes
+        # the write lock up front, so contention fails here rather than after a long scan.
+        # A rollback also restores the FTS triggers, since SQLite DDL is transactional.
+        with self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            for file_data in indexer.scan(known=known):
+                batch.append((
+                    f"file://{file_data['path']}", 
+                    file_data['name'], 
+                    'local-file', 
+                    f"Local file: {file_data['rel_path']}", 
+                    'file,code', 
+                    1,
+                    file_data['hash'],
+                    file_data['content'],
+                    file_data['sig']
+                ))
+                if len(batch) >= self._BATCH_SIZE:
+                    self.cursor.executemany(self._INSERT_FILE_SQL, batch)
+                    self._sync_categories_for_urls([row[0] for row in batch])
+                    count += len(batch)
+                    batch.clear()
+                    if not fts_suspended and self._fts_bulk_worthwhile(count):
+                        # Mostly new rows: stop per-row FTS upkeep, rebuild once at the end
+                        self._suspend_fts_triggers()
+                        fts_suspended = True
+                    if show_progress and time.monotonic() >= next_progress:
+                        next_progress = time.monotonic() + 0.1
+                        print(f"   Indexed {count} files...", end='\r', flush=True)
+            if batch:
+                self.cursor.executemany(self._INSERT_FILE_SQL, batch)
+                self._sync_categories_for_urls([row[0] for row in batch])
+                count += len(batch)
+            if fts_suspended:
+                self._rebuild_fts_index()
+        unchanged = f" ({indexer.unchanged} unchanged)" if indexer.unchanged else ""
+        print(f"✅ Indexed {count} files{unchanged}.")
 
     def index_nexus_suite(self):
         """
@@ -597,6 +1247,7 @@ class SecureMcpLibrary:
             import yaml
             data = yaml.safe_load(path.read_text(errors='ignore')) or {}
             servers = data.get("servers", [])
+            rows = []
             for s in servers:
                 # Map to Knowledge Schema
                 name = s.get("name", "Unknown")
@@ -606,21 +1257,20 @@ class SecureMcpLibrary:
                 # Create a pseudo-URL for the knowledge base
                 url = f"mcp://observer/server/{s.get('id', name)}"
                 
-                self.cursor.execute('''
-                    INSERT OR REPLACE INTO links 
-                    (url, title, domain, description, categories, is_active, hash, content) 
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
+                rows.append((
                     url,
                     f"Server: {name}",
                     "mcp-observer",
                     desc,
                     "suite_inventory,server",
                     1,
-                    hashlib.sha256(str(s).encode()).hexdigest(),
+                    # Canonical JSON, so the hash does not depend on YAML key order
+                    hashlib.sha256(json.dumps(s, sort_keys=True, default=str).encode()).hexdigest(),
                     json.dumps(s, indent=2) # Store full metadata as content
                 ))
-            self.conn.commit()
+            with self.conn:
+                self.cursor.executemany(self._INSERT_LINK_SQL, rows)
+                self._sync_categories_for_urls([row[0] for row in rows])
             print(f"   Indexed {len(servers)} servers from Observer.")
         except Exception as e:
             print(f"❌ Failed to index inventory: {e} (Need pyyaml?)")
@@ -632,14 +1282,9 @@ class SecureMcpLibrary:
             data = json.loads(path.read_text(errors='ignore'))
             ide_paths = data.get("ide_config_paths", {})
             
-            for ide, conf_path in ide_paths.items():
-                url = f"mcp://injector/ide/{ide}"
-                self.cursor.execute('''
-                    INSERT OR REPLACE INTO links 
-                    (url, title, domain, description, categories, is_active, hash, content) 
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    url,
+            rows = [
+                (
+                    f"mcp://injector/ide/{ide}",
                     f"IDE Config: {ide.upper()}",
                     "mcp-injector",
                     f"Managed config file for {ide}",
@@ -647,8 +1292,12 @@ class SecureMcpLibrary:
                     1,
                     hashlib.sha256(str(conf_path).encode()).hexdigest(),
                     json.dumps({"ide": ide, "path": conf_path}, indent=2)
-                ))
-            self.conn.commit()
+                )
+                for ide, conf_path in ide_paths.items()
+            ]
+            with self.conn:
+                self.cursor.executemany(self._INSERT_LINK_SQL, rows)
+                self._sync_categories_for_urls([row[0] for row in rows])
             print(f"   Indexed {len(ide_paths)} managed IDEs.")
         except Exception as e:
             print(f"❌ Failed to index injector config: {e}")
@@ -720,13 +1369,102 @@ Required Outcome: `3` (Verified via `atp_sandbox.py`)
         # We find the observer server link and update it
         url = f"mcp://observer/server/{server_id}"
         self.cursor.execute("UPDATE links SET categories = categories || ? WHERE url = ?", ("," + ",".join(tags), url))
+        self._sync_categories("url = ?", (url,))
         self.conn.commit()
         return True
 
+def _gitignore_regex(pattern: str):
+    """
+    Translate one .gitignore line into (regex, negated), or None for blanks and comments.
+    The regex is meant for re.match against a '/'-separated path relative to the root and
+    also matches everything below a matching directory. Handles '!', leading and trailing
+    '/', '**', '*', '?', [...] classes and backslash escapes.
+    """
+    if not pattern or pattern.startswith("#"):
+        return None
+    negated = pattern.startswith("!")
+    if negated:
+        pattern = pattern[1:]
+    dir_only = pattern.endswith("/")
+    pattern = pattern.rstrip("/")
+    if not pattern:
+        return None
+    # A slash anywhere but the end anchors the pattern to the root; otherwise any depth
+    anchored = "/" in pattern
+    pattern = pattern.lstrip("/")
+    out, i, n = [], 0, len(pattern)
+    while i < n:
+        c = pattern[i]
+        if c == "*":
+            if pattern.startswith("**", i) and (i == 0 or pattern[i - 1] == "/") and (i + 2 == n or pattern[i + 2] == "/"):
+                if i + 2 == n:
+                    out.append(".*")  # trailing '/**': everything inside
+                    i += 2
+                else:
+                    out.append("(?:.*/)?")  # '**/': zero or more directories
+                    i += 3
+                continue
+            seg_end = pattern.find("/", i)
+            seg_end = n if seg_end == -1 else seg_end
+            if (i == 0 or pattern[i - 1] == "/") and pattern.count("*", i, seg_end) == seg_end - i:
+                # A segment of only '*' names an entry, so it never matches the empty string:
+                # 'docs/*' covers what is inside docs/, not the directory 'docs/' itself
+                out.append("[^/]+")
+                i = seg_end
+                continue
+            out.append("[^/]*")
+        elif c == "?":
+            out.append("[^/]")
+        elif c == "[":
+            j = pattern.find("]", i + 2 if pattern.startswith(("[!", "[^"), i) else i + 1)
+            if j == -1:
+                out.append(re.escape(c))
+            else:
+                body = pattern[i + 1:j]
+                if body.startswith("!"):
+                    body = "^" + body[1:]
+                out.append("[" + body.replace("\\", "\\\\") + "]")
+                i = j
+        elif c == "\\" and i + 1 < n:
+            i += 1
+            out.append(re.escape(pattern[i]))
+        else:
+            out.append(re.escape(c))
+        i += 1
+    prefix = "" if anchored else "(?:.*/)?"
+    # Directory-only patterns need something below them (or the '/' that marks a directory)
+    suffix = "/" if dir_only else "(?:/|$)"
+    return prefix + "".join(out) + suffix, negated
+
+def _reinclude_prefix(pattern: str) -> Optional[str]:
+    """
+    For a '!' .gitignore line, the directory prefix ('a/b/') every path it re-includes
+    starts with; '' when it can match at any depth. None for non-negated lines.
+    """
+    if not pattern.startswith("!"):
+        return None
+    body = pattern[1:].rstrip("/")
+    if "/" not in body:
+        return ""
+    literal = re.split(r"[*?\[\\]", body.lstrip("/"), maxsplit=1)[0]
+    return literal[:literal.rfind("/") + 1]
+
 class FileIndexer:
+    # Internal hard-ignores, matched against every path component
+    INTERNAL_IGNORES = frozenset({".git", "__pycache__", ".venv", "node_modules", ".DS_Store"})
+    # Indexed file extensions, lowercase and without the dot (matched case-insensitively)
+    EXTENSIONS = frozenset({'md', 'txt', 'py', 'js', 'json', 'yaml', 'yml', 'sh', 'html', 'css'})
+
     def __init__(self, root_path: str):
         self.root = Path(root_path).resolve()
+        # Root with a trailing separator: rel paths are a plain slice of os.fspath(path)
+        self._root_prefix = os.path.join(str(self.root), "")
         self.ignore_patterns = self._load_gitignore()
+        self._spec = self._compile_spec()
+        self._ignore_re, self._negate_re = self._compile_patterns()
+        # Directories that a '!' pattern could reach below are never pruned from the walk
+        self._reinclude_prefixes = tuple(
+            prefix for prefix in map(_reinclude_prefix, self.ignore_patterns) if prefix is not None)
     
     def _load_gitignore(self):
         patterns = ['.git', '__pycache__', 'node_modules', '.venv', '.DS_Store', '*.pyc']
@@ -739,82 +1477,234 @@ class FileIndexer:
                         patterns.append(line)
         return patterns
 
-    def _should_ignore(self, path: Path):
-        """
-        Determine if a file should be ignored based on .gitignore patterns.
-        Tiered Reliability: Uses pathspec (Industrial mode) or Regex (Standard mode).
-        """
-        # 1. Permanent Tier: Try PathSpec
+    def _compile_spec(self):
+        """Build the pathspec matcher once per indexer (None if pathspec is unavailable)."""
         try:
             from pathspec import PathSpec
             from pathspec.patterns import GitWildMatchPattern
-            # Cache the spec for performance if needed, but for now we re-parse
-            spec = PathSpec.from_lines(GitWildMatchPattern, self.ignore_patterns)
-            if spec.match_file(str(path.relative_to(self.root))):
-                return True
         except ImportError:
-            pass # Fallback to standard
+            return None
+        return PathSpec.from_lines(GitWildMatchPattern, self.ignore_patterns)
+
+    def _compile_patterns(self):
+        """
+        Standard tier: translate every pattern with _gitignore_regex and fold them into two
+        alternations, so each check is a single regex call however many patterns there are.
+        Returns (ignore_re, negate_re); either may be None when there is nothing to match.
+        """
+        ignore_parts, negate_parts = [], []
+        for pattern in self.ignore_patterns:
+            translated = _gitignore_regex(pattern)
+            if translated is not None:
+                regex, negated = translated
+                (negate_parts if negated else ignore_parts).append(f"(?:{regex})")
+        # Match case-insensitively where the filesystem does (normcase folds case there)
+        flags = re.IGNORECASE if os.path.normcase("A") == "a" else 0
+        ignore_re = re.compile("|".join(ignore_parts), flags) if ignore_parts else None
+        negate_re = re.compile("|".join(negate_parts), flags) if negate_parts else None
+        return ignore_re, negate_re
+
+    def _standard_ignored(self, rel: str) -> bool:
+        """Standard-tier verdict for a '/'-separated relative path (directories end with '/')."""
+        if os.sep != "/":
+            rel = rel.replace(os.sep, "/")
+        if self._ignore_re is None or not self._ignore_re.match(rel):
+            return False
+        return self._negate_re is None or not self._negate_re.match(rel)
+
+    def _rel_path(self, path: Path) -> str:
+        return os.fspath(path)[len(self._root_prefix):]
+
+    def _should_ignore(self, path: Path, rel_path: Optional[str] = None):
+        """
+        Determine if a file should be ignored based on .gitignore patterns.
+        Tiered Reliability: Uses pathspec (Industrial mode) or Regex (Standard mode).
+        """
+        if rel_path is None:
+            rel_path = self._rel_path(path)
+
+        # 1. Permanent Tier: PathSpec
+        if self._spec is not None and self._spec.match_file(rel_path):
+            return True
             
         # 2. Standard Tier: Regex-based ignoring (Pure Python)
-        import fnmatch
-        rel_path = str(path.relative_to(self.root))
-        
-        # Internal hard-ignores
-        internal_ignores = [".git", "__pycache__", ".venv", "node_modules", ".DS_Store"]
-        if any(part in internal_ignores for part in path.parts):
+        if not self.INTERNAL_IGNORES.isdisjoint(path.parts):
             return True
 
-        for pattern in self.ignore_patterns:
-            if not pattern or pattern.startswith("#"):
-                continue
-            
-            # Use regex for more accurate matching than fnmatch
-            # (Simplified gitignore->regex conversion)
-            regex = pattern.replace(".", "\\.").replace("*", ".*").replace("?", ".")
-            if pattern.startswith("/"):
-                regex = "^" + regex[1:]
-            
-            try:
-                if re.search(regex, rel_path) or fnmatch.fnmatch(path.name, pattern):
-                    return True
-            except OSError as e:
-                logger.error(f"OS error: {e}", exc_info=True)
-                continue
-                
-        return False
+        return self._standard_ignored(rel_path)
+
+    def _dir_ignored(self, rel_dir: str) -> bool:
+        """
+        True if everything under rel_dir would be ignored, so the walk can skip it.
+        Only matchers that also hit every descendant path are consulted here; the
+        per-file name globs are still applied in _should_ignore. A directory a negation
+        pattern could re-include something under is always descended.
+        """
+        rel = (rel_dir if os.sep == "/" else rel_dir.replace(os.sep, "/")) + "/"
+        if any(rel.startswith(p) or p.startswith(rel) for p in self._reinclude_prefixes):
+            return False
+        if self._spec is not None and self._spec.match_file(rel_dir + "/"):
+            return True
+        return self._standard_ignored(rel_dir + "/")
 
-    def scan(self):
-        extensions = {'.md', '.txt', '.py', '.js', '.json', '.yaml', '.yml', '.sh', '.html', '.css'}
-        for path in self.root.rglob('*'):
-            if path.is_file() and path.suffix in extensions:
-                if self._should_ignore(path):
+    @staticmethod
+    def _read_and_hash(path: Path, limit: int = MAX_TEXT_BYTES):
+        """
+        Return (text, sha256 hexdigest) reading the file as bytes in one pass, or None
+        if it looks binary. The digest covers the whole file; only the first `limit`
+        bytes are kept as text.
+        """
+        with open(path, 'rb') as f:
+            raw = f.read(limit)
+            if _looks_binary(raw):
+                return None
+            h = hashlib.sha256(raw)
+            if len(raw) == limit:
+                # Hash the remainder through one reused buffer rather than a bytes object per block
+                buf = bytearray(1 << 16)
+                view = memoryview(buf)
+                while n := f.readinto(buf):
+                    h.update(view[:n])
+        return _decode_text(raw), h.hexdigest()
+
+    def _iter_candidates(self):
+        """Yield (path, rel_path, stat signature) for every indexable, non-ignored file under root."""
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            # Prune ignored directories in place so os.walk never descends into them
+            rel_base = dirpath[len(self._root_prefix):]
+            rel_base = rel_base + os.sep if rel_base else ""
+            dirnames[:] = [d for d in dirnames
+                           if d not in self.INTERNAL_IGNORES and not self._dir_ignored(rel_base + d)]
+            for name in filenames:
+                stem, _, ext = name.rpartition('.')
+                if not stem or ext.lower() not in self.EXTENSIONS:
+                    continue
+                path = Path(dirpath, name)
+                rel_path = rel_base + name
+                # Ignore rules are pure string matching: apply them before paying for a stat
+                if self._should_ignore(path, rel_path):
                     continue
-                
                 try:
-                    content = path.read_text(errors='ignore')
-                    yield {
-                        'path': str(path),
-                        'rel_path': str(path.relative_to(self.root)),
-                        'name': path.name,
-                        'content': content,
-                        'hash': hashlib.sha256(content.encode()).hexdigest()
-                    }
-                except Exception as e:
-                    print(f"⚠️  Skipping {path.name}: {e}")
+                    st = path.stat()
+                except OSError:
+                    continue
+                # Regular files only, and nothing big enough to blow up memory
+                if not stat.S_ISREG(st.st_mode) or st.st_size > MAX_TEXT_BYTES:
+                    continue
+                yield path, rel_path, _stat_sig(st)
+
+    def _read_one(self, path: Path, rel_path: str, sig: str):
+        try:
+            read = self._read_and_hash(path)
+        except Exception as e:
+            print(f"⚠️  Skipping {path.name}: {e}")
+            return None
+        if read is None:
+            return None  # binary content behind a text extension
+        content, digest = read
+        return {
+            'path': str(path),
+            'rel_path': rel_path,
+            'name': path.name,
+            'content': content,
+            'hash': digest,
+            'sig': sig
+        }
+
+    def scan(self, max_workers: Optional[int] = None, known: Optional[Dict[str, str]] = None):
+        """
+        Yield file records in walk order. Reading and hashing fan out to a thread
+        pool (both release the GIL); at most a few batches are in flight at once.
+        Files whose path maps to their current stat signature in `known` are skipped
+        unread and counted in self.unchanged.
+        """
+        workers = max_workers or min(32, (os.cpu_count() or 1) * 2)
+        window = workers * 4
+        pending = deque()
+        known = known or {}
+        self.unchanged = 0
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for path, rel_path, sig in self._iter_candidates():
+                if known.get(str(path)) == sig:
+                    self.unchanged += 1
+                    continue
+                pending.append(pool.submit(self._read_one, path, rel_path, sig))
+                if len(pending) >= window:
+                    item = pending.popleft().result()
+                    if item is not None:
+                        yield item
+            while pending:
+                item = pending.popleft().result()
+                if item is not None:
+                    yield item
 
 if FileSystemEventHandler is None:
     class FileSystemEventHandler:
         pass
 
+# Watcher backends in order of preference; MCP_WATCH_BACKEND can force one of them
+_WATCH_BACKENDS = ("watchfiles", "native", "polling")
+
+def _watch_backend() -> Optional[str]:
+    """Pick the file-watching backend to use, or None when no watcher library is installed."""
+    available = {
+        "watchfiles": watchfiles is not None,
+        "native": Observer is not None,
+        "polling": PollingObserver is not None,
+    }
+    forced = (os.environ.get("MCP_WATCH_BACKEND") or "").strip().lower()
+    if forced:
+        if available.get(forced):
+            return forced
+        print(f"⚠️  MCP_WATCH_BACKEND={forced!r} is unavailable; choosing automatically.", file=sys.stderr)
+    return next((b for b in _WATCH_BACKENDS if available[b]), None)
+
+# Filesystem types whose change notifications do not reach this host; these roots are polled
+_NETWORK_FS = frozenset({"nfs", "nfs4", "cifs", "smb3", "smbfs", "afs", "9p", "ncpfs",
+                         "fuse.sshfs", "fuse.rclone", "davfs", "glusterfs", "ceph"})
+
+def _is_network_mount(path: str) -> bool:
+    """True when path lives on a network filesystem according to /proc/mounts (Linux only)."""
+    try:
+        with open("/proc/mounts", encoding="utf-8") as fh:
+            mounts = [line.split()[1:3] for line in fh]
+    except OSError:
+        return False
+    best, fstype = "", ""
+    for point, kind in mounts:
+        point = point.replace("\\040", " ")
+        if (path == point or path.startswith(point.rstrip("/") + "/")) and len(point) > len(best):
+            best, fstype = point, kind
+    return fstype in _NETWORK_FS
+
 class NexusWatcher(FileSystemEventHandler):
     """
     Real-time file observer for the Librarian.
-    Re-indexes files when they are modified or created.
+    Re-indexes files when they are modified or created. Events are debounced: a burst
+    of saves to one file is re-indexed once, and each flush commits in one transaction.
+    Backend: watchfiles if installed, else watchdog's native observer, else its poller;
+    set MCP_WATCH_BACKEND=watchfiles|native|polling to force one. Roots on network
+    mounts get no native events and are always polled, every MCP_WATCH_INTERVAL seconds.
     """
+    # A path is re-indexed once it has been quiet for this long
+    DEBOUNCE_SECONDS = 0.25
+    # Poll period for network-mounted roots; each poll stats the whole tree
+    WATCH_INTERVAL = 60.0
+
     def __init__(self, library: SecureMcpLibrary, paths: List[str]):
         self.library = library
         self.paths = paths
         self.observer = None
+        self.poller = None
+        # path -> monotonic time of its latest event, oldest first
+        self._pending = OrderedDict()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopping = False
+        self._flusher = None
+        # watchfiles backend: its iterator thread and the event that ends it
+        self._watch_thread = None
+        self._watch_stop = threading.Event()
 
     def on_modified(self, event):
         if not event.is_directory:
@@ -831,37 +1721,295 @@ class NexusWatcher(FileSystemEventHandler):
         if any(part.startswith('.') for part in path.parts):
             return
         
-        # Log to file since stdout is redirected in MCP mode
-        self.library.cursor.execute("INSERT INTO links (url, title, domain, categories, content) VALUES (?, ?, ?, ?, ?)", 
-                                   (f"log://watcher/{time.time()}", "Watcher Event", "system", "debug", f"Detected: {path.name}"))
-        self.library.conn.commit()
-        
-        print(f"🔄 Change detected: {path.name}. Re-indexing...", file=sys.stderr)
-        # Add or update in DB
-        try:
-            self.library.add_link(f"file://{path_str}", categories=['auto-indexed'])
-        except Exception as e:
-            print(f"❌ Auto-index failed for {path.name}: {e}", file=sys.stderr)
+        with self._lock:
+            self._pending[path_str] = time.monotonic()
+            self._pending.move_to_end(path_str)
+        self._wake.set()
+
+    def _flush_pending(self, force: bool = False):
+        """Re-index every pending path that has been quiet for DEBOUNCE_SECONDS (all of them if force)."""
+        cutoff = time.monotonic() - self.DEBOUNCE_SECONDS
+        with self._lock:
+            due = [p for p, t in self._pending.items() if force or t <= cutoff]
+            for p in due:
+                del self._pending[p]
+        if not due:
+            return
+        # FTS triggers stay in place here: the connection is shared with the server thread,
+        # whose commits could persist a trigger-less schema mid-flush
+        with self.library.conn:
+            for path_str in due:
+                name = Path(path_str).name
+                # Log to file since stdout is redirected in MCP mode
+                self.library.cursor.execute("INSERT INTO links (url, title, domain, categories, content) VALUES (?, ?, ?, ?, ?)", 
+                                           (f"log://watcher/{time.time()}", "Watcher Event", "system", "debug", f"Detected: {name}"))
+                self.library._sync_categories("id = ?", (self.library.cursor.lastrowid,))
+                
+                print(f"🔄 Change detected: {name}. Re-indexing...", file=sys.stderr)
+                # Add or update in DB
+                try:
+                    self.library.add_link(f"file://{path_str}", categories=['auto-indexed'], commit=False)
+                except Exception as e:
+                    print(f"❌ Auto-index failed for {name}: {e}", file=sys.stderr)
+
+    def _flush_loop(self):
+        while not self._stopping:
+            self._wake.wait()
+            time.sleep(self.DEBOUNCE_SECONDS)
+            with self._lock:
+                if not self._pending:
+                    self._wake.clear()
+            try:
+                self._flush_pending()
+            except Exception as e:
+                print(f"❌ Watcher flush failed: {e}", file=sys.stderr)
+
+    def _run_watchfiles(self, paths: List[str]):
+        """Feed watchfiles change batches into the debounce queue until stop() is called."""
+        changed = (watchfiles.Change.added, watchfiles.Change.modified)
+        for changes in watchfiles.watch(*paths, step=50, debounce=200, stop_event=self._watch_stop):
+            for change, path_str in changes:
+                if change in changed and not os.path.isdir(path_str):
+                    self._handle_change(path_str)
 
     def start(self):
-        if not PollingObserver:
+        backend = _watch_backend()
+        if backend is None:
             print("❌ Watchdog not installed. Cannot start watcher.", file=sys.stderr)
             return False
-            
-        self.observer = PollingObserver()
+
+        roots, remote = [], []
         for p in self.paths:
             path_obj = Path(p).resolve()
             if path_obj.exists():
-                self.observer.schedule(self, str(path_obj), recursive=True)
-                print(f"👁️  Watching: {path_obj}", file=sys.stderr)
-        
-        self.observer.start()
+                if PollingObserver is not None and _is_network_mount(str(path_obj)):
+                    remote.append(str(path_obj))
+                    print(f"👁️  Watching (polled, network mount): {path_obj}", file=sys.stderr)
+                else:
+                    roots.append(str(path_obj))
+                    print(f"👁️  Watching: {path_obj}", file=sys.stderr)
+
+        if remote:
+            try:
+                interval = float(os.environ.get("MCP_WATCH_INTERVAL") or self.WATCH_INTERVAL)
+            except ValueError:
+                interval = self.WATCH_INTERVAL
+            self.poller = PollingObserver(timeout=interval)
+            for root in remote:
+                self.poller.schedule(self, root, recursive=True)
+            self.poller.start()
+
+        if backend == "watchfiles":
+            if roots:
+                self._watch_stop.clear()
+                self._watch_thread = threading.Thread(target=self._run_watchfiles, args=(roots,),
+                                                      name="nexus-watchfiles", daemon=True)
+                self._watch_thread.start()
+        elif roots:
+            self.observer = Observer() if backend == "native" else PollingObserver()
+            for root in roots:
+                self.observer.schedule(self, root, recursive=True)
+            self.observer.start()
+        self._stopping = False
+        self._flusher = threading.Thread(target=self._flush_loop, name="nexus-watcher-flush", daemon=True)
+        self._flusher.start()
         return True
 
     def stop(self):
-        if self.observer:
-            self.observer.stop()
-            self.observer.join()
+        for observer in (self.observer, self.poller):
+            if observer:
+                observer.stop()
+                observer.join()
+        if self._watch_thread:
+            self._watch_stop.set()
+            self._watch_thread.join()
+            self._watch_thread = None
+        if self._flusher:
+            self._stopping = True
+            self._wake.set()
+            self._flusher.join()
+            self._flusher = None
+        # Events that arrived inside the debounce window are still indexed
+        self._flush_pending(force=True)
+
+# The tool manifest is static: built once at import, never per tools/list or search_api call
+_TOOLS_MANIFEST = [{
+    "name": "search_knowledge_base",
+    "description": "Search indexed files and documents within a named stack (knowledge context). WORKFLOW: 1) If the user hasn't specified a stack, call list_stacks first to see available stacks (like NotebookLM projects). 2) Call get_categories on the chosen stack to understand what's inside. 3) Then search with a query + stack name. Omit stack to search across all stacks.",
+    "inputSchema": {
+        "type": "object",
+        "properties": {
+            "query": {
+                "type": "string",
+                "description": "Search term"
+            },
+            "stack": {
+                "type": "string",
+                "description": "Stack name to search within (e.g. 'gravity-research', 'cookie-recipes'). Call list_stacks first if unsure. Omit to search all stacks."
+            }
+        },
+        "required": ["query"]
+    }
+}, {
+    "name": "add_resource",
+    "description": "Add a new resource (URL or file) to the Knowledge Base. Assign it to a named stack to keep it grouped with related knowledge. Stacks are isolated knowledge contexts — like NotebookLM projects, but called stacks here. Example: stack='gravity-research' for physics papers, stack='cookie-recipes' for baking docs.",
+    "inputSchema": {
+        "type": "object",
+        "properties": {
+            "url": {"type": "string", "description": "URL or file:// path to add"},
+            "categories": {"type": "string", "description": "Comma-separated categories (e.g. 'docs,api')"},
+            "stack": {"type": "string", "description": "Stack name to file this resource under (e.g. 'gravity-research'). Defaults to 'default'. Create a new stack by simply using a new name."}
+        },
+        "required": ["url"]
+    }
+}, {
+    "name": "update_resource",
+    "description": "Update an existing resource",
+    "inputSchema": {
+        "type": "object",
+        "properties": {
+            "id": {"type": "integer", "description": "Resource ID"},
+            "url": {"type": "string", "description": "New URL (optional)"},
+            "title": {"type": "string", "description": "New Title (optional)"},
+            "active": {"type": "boolean", "description": "Set active state (optional)"}
+        },
+        "required": ["id"]
+    }
+}, {
+    "name": "delete_resource",
+    "description": "Delete a resource by ID",
+    "inputSchema": {
+        "type": "object",
+        "properties": {
+            "id": {"type": "integer", "description": "Resource ID to delete"}
+        },
+        "required": ["id"]
+    }
+}, {
+    "name": "check_health",
+    "description": "Check the health of the Librarian's dependencies (pypdf, openpyxl, etc.)",
+    "inputSchema": {
+        "type": "object",
+        "properties": {},
+        "required": []
+    }
+}, {
+    "name": "update_dependencies",
+    "description": "Update or install missing dependencies for the Librarian",
+    "inputSchema": {
+        "type": "object",
+        "properties": {
+            "packages": {
+                "type": "string",
+                "description": "Space-separated list of packages to install (e.g. 'pypdf openpyxl')"
+            }
+        },
+        "required": ["packages"]
+    }
+}, {
+    "name": "start_watcher",
+    "description": "Start a real-time file watcher for specific directories",
+    "inputSchema": {
+        "type": "object",
+        "properties": {
+            "paths": {
+                "type": "array",
+                "items": {"type": "string"},
+                "description": "List of directories to watch"
+            }
+        },
+        "required": ["paths"]
+    }
+}, {
+    "name": "get_watcher_logs",
+    "description": "Retrieve internal debug logs from the file watcher",
+    "inputSchema": {
+        "type": "object",
+        "properties": {},
+        "required": []
+    }
+}, {
+    "name": "search_api",
+    "description": "ATP Tool: Search for available tool signatures by intent or keyword. Prevents context bloat.",
+    "inputSchema": {
+        "type": "object",
+        "properties": {
+            "query": {"type": "string", "description": "Intent or keyword to search for"}
+        },
+        "required": ["query"]
+    }
+}, {
+    "name": "execute_code",
+    "description": "ATP Tool: Execute Python code in a restricted sandbox for data processing (map/filter/reduce).",
+    "inputSchema": {
+        "type": "object",
+        "properties": {
+            "code": {"type": "string", "description": "Python code block to execute"},
+            "context": {"type": "object", "description": "Optional data context for the code"}
+        },
+        "required": ["code"]
+    }
+}, {
+    "name": "prepopulate_docs",
+    "description": "Generate standard ARCHITECTURE.md and README.md for a directory",
+    "inputSchema": {
+        "type": "object",
+        "properties": {
+            "path": {"type": "string", "description": "Absolute path to the directory"}
+        },
+        "required": ["path"]
+    }
+}, {
+    "name": "link_categories",
+    "description": "Associate tags/categories with a forged server",
+    "inputSchema": {
+        "type": "object",
+        "properties": {
+            "server_id": {"type": "string", "description": "ID of the server"},
+            "tags": {"type": "array", "items": {"type": "string"}, "description": "List of tags"}
+        },
+        "required": ["server_id", "tags"]
+    }
+}, {
+    "name": "list_stacks",
+    "description": "List all named stacks (knowledge contexts) that have indexed resources. Stacks are like projects in NotebookLM or notebooks in Stitch — each one is an isolated, named knowledge context. Call this first whenever the user wants to search or browse without specifying a stack, so you can ask them which context to use.",
+    "inputSchema": {
+        "type": "object",
+        "properties": {}
+    }
+}, {
+    "name": "get_categories",
+    "description": "Browse the categories of knowledge inside a stack (or across all stacks). Use before searching to understand what topics are covered, so you can guide the user to the right search terms or confirm they have the right stack.",
+    "inputSchema": {
+        "type": "object",
+        "properties": {
+            "stack": {
+                "type": "string",
+                "description": "Optional: scope to this stack. Omit to see categories across all stacks."
+            }
+        }
+    }
+}]
+_TOOLS_LIST_RESULT = {"tools": _TOOLS_MANIFEST}
+# search_api matching keys, lowercased once: (name, description, tool)
+_TOOL_SEARCH_KEYS = tuple((t["name"].lower(), t["description"].lower(), t) for t in _TOOLS_MANIFEST)
+_TOOL_WORD_SPLIT_RE = re.compile(r"[\W_]+")
+
+def _tool_words(text: str) -> set:
+    """Lowercased words of text, split on anything that is not a letter or digit."""
+    return {w for w in _TOOL_WORD_SPLIT_RE.split(text.lower()) if w}
+
+def _build_tool_index() -> Dict[str, set]:
+    """Map every prefix of every name/description word to the manifest positions containing it."""
+    index: Dict[str, set] = {}
+    for pos, tool in enumerate(_TOOLS_MANIFEST):
+        for word in _tool_words(f"{tool['name']} {tool['description']}"):
+            for end in range(1, len(word) + 1):
+                index.setdefault(word[:end], set()).add(pos)
+    return index
+
+# Prefix keys keep partial words matching ("sandb" -> sandbox, "stack" -> stacks)
+_TOOL_TOKEN_INDEX = _build_tool_index()
 
 class MCPServer:
     def __init__(self):
@@ -875,6 +2023,36 @@ class MCPServer:
         log_dir = self.library.app_dir / "logs"
         log_dir.mkdir(parents=True, exist_ok=True)
         self.log_path = log_dir / "librarian_errors.log"
+        if atp_sb is not None:
+            # Persist validated sandbox snippets across server restarts
+            atp_sb.cache_dir = self.library.app_dir / "atp_cache"
+        # Recently read file/remote resources: uri -> (monotonic timestamp, text, file sig or None)
+        self._res_cache = OrderedDict()
+        # O(1) dispatch tables: JSON-RPC method -> handler, tools/call name -> handler
+        self._method_handlers = {
+            "initialize": self._rpc_initialize,
+            "resources/list": self._rpc_resources_list,
+            "resources/read": self._rpc_resources_read,
+            "tools/list": self._rpc_tools_list,
+            "tools/call": self._rpc_tools_call,
+            "ping": self._rpc_ping,
+        }
+        self._tool_handlers = {
+            "search_knowledge_base": self._tool_search_knowledge_base,
+            "search_api": self._tool_search_api,
+            "execute_code": self._tool_execute_code,
+            "add_resource": self._tool_add_resource,
+            "update_resource": self._tool_update_resource,
+            "delete_resource": self._tool_delete_resource,
+            "check_health": self._tool_check_health,
+            "update_dependencies": self._tool_update_dependencies,
+            "start_watcher": self._tool_start_watcher,
+            "get_watcher_logs": self._tool_get_watcher_logs,
+            "prepopulate_docs": self._tool_prepopulate_docs,
+            "link_categories": self._tool_link_categories,
+            "list_stacks": self._tool_list_stacks,
+            "get_categories": self._tool_get_categories,
+        }
         self.watcher = None
         # GAP-R3 FIX: Auto-start watcher on documents/ directory at server launch.
         # Mission: "the ecosystem's memory is always accessible" requires continuous indexing.
@@ -882,10 +2060,10 @@ class MCPServer:
 
     def _auto_start_watcher(self):
         """Auto-start the file watcher on the documents/ directory at launch.
-        Falls back gracefully if watchdog is not installed."""
-        if PollingObserver is None:
+        Falls back gracefully if neither watchfiles nor watchdog is installed."""
+        if _watch_backend() is None:
             print("ℹ️  Watchdog not installed — real-time watcher disabled.", file=sys.stderr)
-            print("   Install with: pip install watchdog", file=sys.stderr)
+            print("   Install with: pip install watchfiles  (or: pip install watchdog)", file=sys.stderr)
             return
         docs_dir = self.library.app_dir / "documents"
         docs_dir.mkdir(parents=True, exist_ok=True)
@@ -913,17 +2091,21 @@ class MCPServer:
         """Run the MCP JSON-RPC loop over stdio."""
         # Ensure we don't pollute stdout with print statements
         # Redirect stdout to formatted JSON messages
-        while True:
+        # Frames are newline-delimited JSON, read and written as bytes
+        stdout = sys.stdout.buffer
+        # BufferedReader iteration returns each line as soon as it arrives; EOF ends the loop
+        for line in sys.stdin.buffer:
             try:
-                line = sys.stdin.readline()
-                if not line:
-                    break
-                
-                request = json.loads(line)
+                if not line.strip():
+                    continue
+
+                request = _json_loads(line)
                 response = self.handle_request(request)
 
                 if response is not None:
-                    print(json.dumps(response), flush=True)
+                    sys.stdout.flush()  # keep any text-layer prints ahead of the frame
+                    stdout.write(_json_dumps_bytes(response) + b"\n")
+                    stdout.flush()
                     
             except json.JSONDecodeError:
                 continue
@@ -944,492 +2126,416 @@ class MCPServer:
         if msg_id is None:
             return None
 
-        result = None
-        error = None
+        # Lifecycle notification: some clients send it with an id; it still gets no response
+        if method == "notifications/initialized":
+            return None
 
+        # Notifications returned above, so every error built here is sent back
+        response = {"jsonrpc": "2.0", "id": msg_id}
         try:
-            if method == "initialize":
+            handler = self._method_handlers.get(method)
+            if handler is None:
+                raise ValueError(f"Method not found: {method}")
+            result = handler(params)
+        except Exception as e:
+            error = {"code": -32603, "message": str(e)}
+            response["error"] = error
+            if session_logger and method == "tools/call":
+                session_logger.log_command(params.get("name", "unknown"), "ERROR", result=error["message"])
+            return response
+
+        response["result"] = result
+        if session_logger and method == "tools/call":
+            res_text = _json_dumps_bytes(result)[:200].decode("utf-8", "ignore") + "..." if result else "None"
+            session_logger.log_command(params.get("name", "unknown"), "SUCCESS", result=res_text)
+        return response
+
+    def _rpc_initialize(self, params):
+        return {
+            "protocolVersion": "2024-11-05",
+            "serverInfo": {
+                "name": "mcp-link-library",
+                "version": "0.1.0"
+            },
+            "capabilities": {
+                "resources": {
+                    "listChanged": False,
+                    "subscribe": False
+                },
+                "tools": {
+                    "listChanged": False
+                }
+            }
+        }
+
+    def _rpc_resources_list(self, params):
+        # OPTIMIZATION: Zero-Token Processing
+        # Do NOT dump thousands of files. Return a capped list + instruction.
+        # Cap at 50 to prevent context flooding; fetch one extra row to detect truncation
+        limit = 50
+        files = self.library.list_links(category="file,code", only_active=True,
+                                        limit=limit + 1, columns=("url", "title"))
+        resources = []
+
+        for f in files[:limit]:
+            # f: url, title
+            resources.append({
+                "uri": f[0],
+                "name": f[1],
+                "mimeType": "text/plain"
+            })
+
+        if len(files) > limit:
+             total = self.library.count_links(category="file,code", only_active=True)
+             resources.append({
+                "uri": "nexus://guidance/search-truncated",
+                "name": f"... ({total - limit} more files) - Use 'search_knowledge_base' tool to find specific files",
+                "mimeType": "text/plain"
+            })
+
+        return {"resources": resources}
+
+    def _rpc_resources_read(self, params):
+        uri = params.get("uri")
+        content = self._read_resource(uri)
+        return {
+            "contents": [{
+                "uri": uri,
+                "mimeType": "text/plain",
+                "text": content
+            }]
+        }
+
+    def _rpc_tools_list(self, params):
+        return _TOOLS_LIST_RESULT
+
+    def _rpc_tools_call(self, params):
+        name = params.get("name")
+        args = params.get("arguments", {})
+        handler = self._tool_handlers.get(name)
+        if handler is None:
+            raise ValueError(f"Unknown tool: {name}")
+        return handler(args)
+
+    def _rpc_ping(self, params):
+        return {}
+
+    # search_knowledge_base lists at most this many matches, best-ranked first
+    _SEARCH_RESULT_LIMIT = 200
+
+    def _tool_search_knowledge_base(self, args):
+        query = args.get("query")
+        stack = args.get("stack") or None
+        limit = self._SEARCH_RESULT_LIMIT
+        # Fetch one extra row to detect truncation without counting every match
+        matches = self.library.list_links(search=query, stack=stack, limit=limit + 1,
+                                          columns=("url", "title", "domain", "stack"))
+        stack_tag = f" in stack '{stack}'" if stack else ""
+        parts = [f"Found matches{stack_tag}:\n"]
+        if not matches:
+            parts.append("No results found.")
+        else:
+            for url, title, domain, link_stack in matches[:limit]:
+                domain_tag = f"[{domain}]" if domain else ""
+                stack_label = f" [{link_stack}]" if link_stack and link_stack != "default" else ""
+                parts.append(f"- {domain_tag}{stack_label} {title} ({url})\n")
+            if len(matches) > limit:
+                total = self.library.count_links(search=query, stack=stack)
+                parts.append(f"... ({total - limit} more matches) - refine the query or pick a stack to narrow them\n")
+
+        return {
+            "content": [{
+                "type": "text",
+                "text": "".join(parts)
+            }]
+        }
+
+    def _tool_search_api(self, args):
+        query = args.get("query", "").lower()
+        words = _tool_words(query)
+        # Word-index hits (every query word prefixes some word of the tool, in any order)
+        # extend the plain substring match; they never replace it
+        hits = set.intersection(*(_TOOL_TOKEN_INDEX.get(w, set()) for w in words)) if words else set()
+        matches = [t for pos, (name, desc, t) in enumerate(_TOOL_SEARCH_KEYS)
+                   if pos in hits or query in name or query in desc]
+        return {
+            "content": [{"type": "text", "text": json.dumps(matches, indent=2)}]
+        }
+
+    def _tool_execute_code(self, args):
+        code = args.get("code", "")
+        context = args.get("context", {})
+        if not atp_sb:
+             result = {"isError": True, "content": [{"type": "text", "text": "ATP Sandbox module missing."}]}
+        else:
+            exec_res = atp_sb.execute(code, context)
+            if exec_res.get("success"):
                 result = {
-                    "protocolVersion": "2024-11-05",
-                    "serverInfo": {
-                        "name": "mcp-link-library",
-                        "version": "0.1.0"
-                    },
-                    "capabilities": {
-                        "resources": {
-                            "listChanged": False,
-                            "subscribe": False
-                        },
-                        "tools": {
-                            "listChanged": False
-                        }
-                    }
+                    "content": [{"type": "text", "text": json.dumps(exec_res["result"], indent=2)}]
                 }
-            elif method == "notifications/initialized":
-                # No response needed for notifications
-                return None
-            elif method == "resources/list":
-                # OPTIMIZATION: Zero-Token Processing
-                # Do NOT dump thousands of files. Return a capped list + instruction.
-                files = self.library.list_links(category="file,code", only_active=True)
-                resources = []
-                
-                # Cap at 50 to prevent context flooding
-                limit = 50
-                for f in files[:limit]:
-                    # f: id, url, title, domain, categories, is_active
-                    resources.append({
-                        "uri": f[1],
-                        "name": f[2],
-                        "mimeType": "text/plain"
-                    })
-                
-                if len(files) > limit:
-                     resources.append({
-                        "uri": "nexus://guidance/search-truncated",
-                        "name": f"... ({len(files) - limit} more files) - Use 'search_knowledge_base' tool to find specific files",
-                        "mimeType": "text/plain"
-                    })
-                    
-                result = {"resources": resources}
-            elif method == "resources/read":
-                uri = params.get("uri")
-                content = self._read_resource(uri)
+            else:
                 result = {
-                    "contents": [{
-                        "uri": uri,
-                        "mimeType": "text/plain",
-                        "text": content
-                    }]
+                    "isError": True,
+                    "content": [{"type": "text", "text": f"Sandbox Error: {exec_res.get('error')}"}]
                 }
-            elif method == "tools/list":
+        return result
+
+    def _tool_add_resource(self, args):
+        url = args.get("url")
+        cats = args.get("categories", "").split(",") if args.get("categories") else None
+        stack = args.get("stack", "default") or "default"
+        try:
+            new_id = self.library.add_link(url, cats, stack=stack)
+            result = {
+                "content": [{"type": "text", "text": f"✅ Added resource ID: {new_id} to stack '{stack}'"}]
+            }
+        except Exception as e:
+            result = {
+                "content": [{"type": "text", "text": f"❌ Failed: {e}"}],
+                "isError": True
+            }
+        return result
+
+    def _tool_update_resource(self, args):
+        rid = args.get("id")
+        url = args.get("url")
+        active = args.get("active")
+        # Note: library.update_link doesn't support title update yet in SQL, 
+        # but we'll wire up what we have.
+        try:
+            success = self.library.update_link(rid, url=url, active=active)
+            msg = f"✅ Updated ID {rid}" if success else f"❌ ID {rid} not found"
+            result = {
+                "content": [{"type": "text", "text": msg}]
+            }
+        except Exception as e:
+             result = {
+                "content": [{"type": "text", "text": f"❌ Failed: {e}"}],
+                "isError": True
+            }
+        return result
+
+    def _tool_delete_resource(self, args):
+        rid = args.get("id")
+        try:
+            self.library.delete_link(rid)
+            result = {
+                "content": [{"type": "text", "text": f"🗑️ Deleted ID {rid}"}]
+            }
+        except Exception as e:
+             result = {
+                "content": [{"type": "text", "text": f"❌ Failed: {e}"}],
+                "isError": True
+            }
+        return result
+
+    def _tool_check_health(self, args):
+        return {
+            "content": [{"type": "text", "text": _health_text()}]
+        }
+
+    def _tool_update_dependencies(self, args):
+        # update_dependencies(packages: str)
+        # Installs one or more pip packages from the ALLOWED_PACKAGES
+        # whitelist.  Packages not in the whitelist are rejected with a
+        # ValueError before pip is ever invoked, preventing supply-chain
+        # attacks via arbitrary PyPI package names.
+        #
+        # Allowed packages (case-insensitive, normalised):
+        #   requests, httpx, aiohttp, urllib3, certifi,
+        #   flask, fastapi, uvicorn, starlette,
+        #   numpy, pandas, scipy, matplotlib, pillow,
+        #   pymupdf, pypdf, openpyxl, python-docx,
+        #   pydantic, click, rich, tqdm, orjson, python-dotenv,
+        #   watchdog, watchfiles, sqlalchemy, psycopg2-binary,
+        #   pytest, pytest-asyncio
+        pkgs = args.get("packages", "")
+        if not pkgs:
+            raise ValueError("No packages specified")
+
+        # Normalise: pip treats hyphens and underscores as equivalent;
+        # lowercase for case-insensitive comparison.  Everything is checked
+        # here, before any subprocess is spawned.
+        requested = pkgs.split()
+        rejected = [
+            orig for orig in requested
+            if orig.lower().replace("_", "-") not in _ALLOWED_PACKAGES_NORM
+        ]
+        if rejected:
+            raise ValueError(
+                f"Package installation rejected — not on approved whitelist: "
+                f"{', '.join(rejected)}. "
+                f"Contact the project maintainer to add a package to ALLOWED_PACKAGES."
+            )
+
+        try:
+            rc, stderr = self._pip_install(requested)
+            if rc == 0:
+                # New packages: drop the import system's directory caches and the health report
+                importlib.invalidate_caches()
+                _health_text.cache_clear()
                 result = {
-                    "tools": [{
-                        "name": "search_knowledge_base",
-                        "description": "Search indexed files and documents within a named stack (knowledge context). WORKFLOW: 1) If the user hasn't specified a stack, call list_stacks first to see available stacks (like NotebookLM projects). 2) Call get_categories on the chosen stack to understand what's inside. 3) Then search with a query + stack name. Omit stack to search across all stacks.",
-                        "inputSchema": {
-                            "type": "object",
-                            "properties": {
-                                "query": {
-                                    "type": "string",
-                                    "description": "Search term"
-                                },
-                                "stack": {
-                                    "type": "string",
-                                    "description": "Stack name to search within (e.g. 'gravity-research', 'cookie-recipes'). Call list_stacks first if unsure. Omit to search all stacks."
-                                }
-                            },
-                            "required": ["query"]
-                        }
-                    }, {
-                        "name": "add_resource",
-                        "description": "Add a new resource (URL or file) to the Knowledge Base. Assign it to a named stack to keep it grouped with related knowledge. Stacks are isolated knowledge contexts — like NotebookLM projects, but called stacks here. Example: stack='gravity-research' for physics papers, stack='cookie-recipes' for baking docs.",
-                        "inputSchema": {
-                            "type": "object",
-                            "properties": {
-                                "url": {"type": "string", "description": "URL or file:// path to add"},
-                                "categories": {"type": "string", "description": "Comma-separated categories (e.g. 'docs,api')"},
-                                "stack": {"type": "string", "description": "Stack name to file this resource under (e.g. 'gravity-research'). Defaults to 'default'. Create a new stack by simply using a new name."}
-                            },
-                            "required": ["url"]
-                        }
-                    }, {
-                        "name": "update_resource",
-                        "description": "Update an existing resource",
-                        "inputSchema": {
-                            "type": "object",
-                            "properties": {
-                                "id": {"type": "integer", "description": "Resource ID"},
-                                "url": {"type": "string", "description": "New URL (optional)"},
-                                "title": {"type": "string", "description": "New Title (optional)"},
-                                "active": {"type": "boolean", "description": "Set active state (optional)"}
-                            },
-                            "required": ["id"]
-                        }
-                    }, {
-                        "name": "delete_resource",
-                        "description": "Delete a resource by ID",
-                        "inputSchema": {
-                            "type": "object",
-                            "properties": {
-                                "id": {"type": "integer", "description": "Resource ID to delete"}
-                            },
-                            "required": ["id"]
-                        }
-                    }, {
-                        "name": "check_health",
-                        "description": "Check the health of the Librarian's dependencies (pypdf, openpyxl, etc.)",
-                        "inputSchema": {
-                            "type": "object",
-                            "properties": {},
-                            "required": []
-                        }
-                    }, {
-                        "name": "update_dependencies",
-                        "description": "Update or install missing dependencies for the Librarian",
-                        "inputSchema": {
-                            "type": "object",
-                            "properties": {
-                                "packages": {
-                                    "type": "string",
-                                    "description": "Space-separated list of packages to install (e.g. 'pypdf openpyxl')"
-                                }
-                            },
-                            "required": ["packages"]
-                        }
-                    }, {
-                        "name": "start_watcher",
-                        "description": "Start a real-time file watcher for specific directories",
-                        "inputSchema": {
-                            "type": "object",
-                            "properties": {
-                                "paths": {
-                                    "type": "array",
-                                    "items": {"type": "string"},
-                                    "description": "List of directories to watch"
-                                }
-                            },
-                            "required": ["paths"]
-                        }
-                    }, {
-                        "name": "get_watcher_logs",
-                        "description": "Retrieve internal debug logs from the file watcher",
-                        "inputSchema": {
-                            "type": "object",
-                            "properties": {},
-                            "required": []
-                        }
-                    }, {
-                        "name": "search_api",
-                        "description": "ATP Tool: Search for available tool signatures by intent or keyword. Prevents context bloat.",
-                        "inputSchema": {
-                            "type": "object",
-                            "properties": {
-                                "query": {"type": "string", "description": "Intent or keyword to search for"}
-                            },
-                            "required": ["query"]
-                        }
-                    }, {
-                        "name": "execute_code",
-                        "description": "ATP Tool: Execute Python code in a restricted sandbox for data processing (map/filter/reduce).",
-                        "inputSchema": {
-                            "type": "object",
-                            "properties": {
-                                "code": {"type": "string", "description": "Python code block to execute"},
-                                "context": {"type": "object", "description": "Optional data context for the code"}
-                            },
-                            "required": ["code"]
-                        }
-                    }, {
-                        "name": "prepopulate_docs",
-                        "description": "Generate standard ARCHITECTURE.md and README.md for a directory",
-                        "inputSchema": {
-                            "type": "object",
-                            "properties": {
-                                "path": {"type": "string", "description": "Absolute path to the directory"}
-                            },
-                            "required": ["path"]
-                        }
-                    }, {
-                        "name": "link_categories",
-                        "description": "Associate tags/categories with a forged server",
-                        "inputSchema": {
-                            "type": "object",
-                            "properties": {
-                                "server_id": {"type": "string", "description": "ID of the server"},
-                                "tags": {"type": "array", "items": {"type": "string"}, "description": "List of tags"}
-                            },
-                            "required": ["server_id", "tags"]
-                        }
-                    }, {
-                        "name": "list_stacks",
-                        "description": "List all named stacks (knowledge contexts) that have indexed resources. Stacks are like projects in NotebookLM or notebooks in Stitch — each one is an isolated, named knowledge context. Call this first whenever the user wants to search or browse without specifying a stack, so you can ask them which context to use.",
-                        "inputSchema": {
-                            "type": "object",
-                            "properties": {}
-                        }
-                    }, {
-                        "name": "get_categories",
-                        "description": "Browse the categories of knowledge inside a stack (or across all stacks). Use before searching to understand what topics are covered, so you can guide the user to the right search terms or confirm they have the right stack.",
-                        "inputSchema": {
-                            "type": "object",
-                            "properties": {
-                                "stack": {
-                                    "type": "string",
-                                    "description": "Optional: scope to this stack. Omit to see categories across all stacks."
-                                }
-                            }
-                        }
-                    }]
+                    "content": [{"type": "text", "text": f"Successfully installed: {pkgs}"}]
                 }
-            elif method == "tools/call":
-                name = params.get("name")
-                args = params.get("arguments", {})
-                if name == "search_knowledge_base":
-                    query = args.get("query")
-                    stack = args.get("stack") or None
-                    matches = self.library.list_links(search=query, stack=stack)
-                    stack_tag = f" in stack '{stack}'" if stack else ""
-                    text = f"Found matches{stack_tag}:\n"
-                    if not matches:
-                        text += "No results found."
-                    else:
-                        for m in matches:
-                            # m = (id, url, title, domain, categories, is_active, stack)
-                            domain_tag = f"[{m[3]}]" if m[3] else ""
-                            stack_label = f" [{m[6]}]" if m[6] and m[6] != "default" else ""
-                            text += f"- {domain_tag}{stack_label} {m[2]} ({m[1]})\n"
-                    
-                    result = {
-                        "content": [{
-                            "type": "text",
-                            "text": text
-                        }]
-                    }
-                elif name == "search_api":
-                    query = args.get("query", "").lower()
-                    tools = self.handle_request({"method": "tools/list", "id": 0})["tools"]
-                    matches = [t for t in tools if query in t["name"].lower() or query in t["description"].lower()]
-                    result = {
-                        "content": [{"type": "text", "text": json.dumps(matches, indent=2)}]
-                    }
-                elif name == "execute_code":
-                    code = args.get("code", "")
-                    context = args.get("context", {})
-                    if not atp_sb:
-                         result = {"isError": True, "content": [{"type": "text", "text": "ATP Sandbox module missing."}]}
-                    else:
-                        exec_res = atp_sb.execute(code, context)
-                        if exec_res.get("success"):
-                            result = {
-                                "content": [{"type": "text", "text": json.dumps(exec_res["result"], indent=2)}]
-                            }
-                        else:
-                            result = {
-                                "isError": True,
-                                "content": [{"type": "text", "text": f"Sandbox Error: {exec_res.get('error')}"}]
-                            }
-                elif name == "add_resource":
-                    url = args.get("url")
-                    cats = args.get("categories", "").split(",") if args.get("categories") else None
-                    stack = args.get("stack", "default") or "default"
-                    try:
-                        new_id = self.library.add_link(url, cats, stack=stack)
-                        result = {
-                            "content": [{"type": "text", "text": f"✅ Added resource ID: {new_id} to stack '{stack}'"}]
-                        }
-                    except Exception as e:
-                        result = {
-                            "content": [{"type": "text", "text": f"❌ Failed: {e}"}],
-                            "isError": True
-                        }
-                elif name == "update_resource":
-                    rid = args.get("id")
-                    url = args.get("url")
-                    active = args.get("active")
-                    # Note: library.update_link doesn't support title update yet in SQL, 
-                    # but we'll wire up what we have.
-                    try:
-                        success = self.library.update_link(rid, url=url, active=active)
-                        msg = f"✅ Updated ID {rid}" if success else f"❌ ID {rid} not found"
-                        result = {
-                            "content": [{"type": "text", "text": msg}]
-                        }
-                    except Exception as e:
-                         result = {
-                            "content": [{"type": "text", "text": f"❌ Failed: {e}"}],
-                            "isError": True
-                        }
-                elif name == "delete_resource":
-                    rid = args.get("id")
-                    try:
-                        self.library.delete_link(rid)
-                        result = {
-                            "content": [{"type": "text", "text": f"🗑️ Deleted ID {rid}"}]
-                        }
-                    except Exception as e:
-                         result = {
-                            "content": [{"type": "text", "text": f"❌ Failed: {e}"}],
-                            "isError": True
-                        }
-                elif name == "check_health":
-                    status = []
-                    status.append(f"pypdf: {'✅' if pypdf else '❌ (pip install pypdf)'}")
-                    status.append(f"openpyxl: {'✅' if openpyxl else '❌ (pip install openpyxl)'}")
-                    status.append(f"python-docx: {'✅' if docx else '❌ (pip install python-docx)'}")
-                    status.append(f"Pillow: {'✅' if Image else '❌ (pip install Pillow)'}")
-                    result = {
-                        "content": [{"type": "text", "text": "\n".join(status)}]
-                    }
-                elif name == "update_dependencies":
-                    # update_dependencies(packages: str)
-                    # Installs one or more pip packages from the ALLOWED_PACKAGES
-                    # whitelist.  Packages not in the whitelist are rejected with a
-                    # ValueError before pip is ever invoked, preventing supply-chain
-                    # attacks via arbitrary PyPI package names.
-                    #
-                    # Allowed packages (case-insensitive, normalised):
-                    #   requests, httpx, aiohttp, urllib3, certifi,
-                    #   flask, fastapi, uvicorn, starlette,
-                    #   numpy, pandas, scipy, matplotlib, pillow,
-                    #   pypdf, openpyxl, python-docx,
-                    #   pydantic, click, rich, tqdm, python-dotenv,
-                    #   watchdog, sqlalchemy, psycopg2-binary,
-                    #   pytest, pytest-asyncio
-                    pkgs = args.get("packages", "")
-                    if not pkgs:
-                        raise ValueError("No packages specified")
-
-                    # Normalise: pip treats hyphens and underscores as equivalent;
-                    # lowercase for case-insensitive comparison.
-                    requested = pkgs.split()
-                    normalised = [p.lower().replace("_", "-") for p in requested]
-                    allowed_norm = frozenset(
-                        p.lower().replace("_", "-") for p in ALLOWED_PACKAGES
-                    )
-                    rejected = [
-                        orig for orig, norm in zip(requested, normalised)
-                        if norm not in allowed_norm
-                    ]
-                    if rejected:
-                        raise ValueError(
-                            f"Package installation rejected — not on approved whitelist: "
-                            f"{', '.join(rejected)}. "
-                            f"Contact the project maintainer to add a package to ALLOWED_PACKAGES."
-                        )
-
-                    import subprocess
-                    try:
-                        cmd = [sys.executable, "-m", "pip", "install"] + requested
-                        subprocess.run(cmd, check=True, capture_output=True)
-                        result = {
-                            "content": [{"type": "text", "text": f"Successfully installed: {pkgs}"}]
-                        }
-                    except subprocess.CalledProcessError as e:
-                        result = {
-                            "content": [{"type": "text", "text": f"Install failed: {e.stderr.decode()}"}],
-                            "isError": True
-                        }
-                    except Exception as e:
-                        result = {
-                            "content": [{"type": "text", "text": f"Install failed: {str(e)}"}],
-                            "isError": True
-                        }
-                elif name == "start_watcher":
-                    if self.watcher:
-                        self.watcher.stop()
-                    
-                    paths = args.get("paths", [])
-                    self.watcher = NexusWatcher(self.library, paths)
-                    success = self.watcher.start()
-                    
-                    if success:
-                        result = {
-                            "content": [{"type": "text", "text": f"👁️  Watcher started for: {', '.join(paths)}"}]
-                        }
-                    else:
-                        result = {
-                            "content": [{"type": "text", "text": "❌ Failed to start watcher (Check logs for details)"}],
-                            "isError": True
-                        }
-                elif name == "get_watcher_logs":
-                    self.library.cursor.execute("SELECT content FROM links WHERE categories = 'debug' ORDER BY id DESC LIMIT 10")
-                    rows = self.library.cursor.fetchall()
-                    text = "Recent Watcher Events:\n" + ("\n".join([r[0] for r in rows]) if rows else "No events recorded.")
-                    result = {
-                        "content": [{"type": "text", "text": text}]
-                    }
-                elif name == "prepopulate_docs":
-                    path = args.get("path")
-                    success = self.library.prepopulate_docs(path)
-                    result = {
-                        "content": [{"type": "text", "text": f"{'✅' if success else '❌'} Documentation prepopulated at {path}"}]
-                    }
-                elif name == "link_categories":
-                    sid = args.get("server_id")
-                    tags = args.get("tags", [])
-                    self.library.link_categories(sid, tags)
-                    result = {
-                        "content": [{"type": "text", "text": f"✅ Linked {len(tags)} tags to {sid}"}]
-                    }
-                elif name == "list_stacks":
-                    stacks = self.library.list_stacks()
-                    if stacks:
-                        text = "Available stacks:\n" + "\n".join(f"- {s}" for s in stacks)
-                    else:
-                        text = "No stacks yet. Add resources with a stack name to create one."
-                    result = {"content": [{"type": "text", "text": text}]}
-                elif name == "get_categories":
-                    stack = args.get("stack") or None
-                    cats = self.library.get_categories(stack=stack)
-                    if cats:
-                        header = f"Categories{' in stack ' + stack if stack else ' (all stacks)'}:"
-                        lines = [header]
-                        for c in cats:
-                            indent = "  " if c["order"] == 1 else "    └─ "
-                            lines.append(f"{indent}{c['category']}  ({c['count']} resources)")
-                        text = "\n".join(lines)
-                    else:
-                        text = "No categories found."
-                    result = {"content": [{"type": "text", "text": text}]}
-                else:
-                    raise ValueError(f"Unknown tool: {name}")
-            elif method == "ping":
-                result = {}
             else:
-                # Ignore unknown notifications, error on requests
-                if msg_id is not None:
-                     raise ValueError(f"Method not found: {method}")
-                return None
-                
+                result = {
+                    "content": [{"type": "text", "text": f"Install failed: {stderr}"}],
+                    "isError": True
+                }
         except Exception as e:
-            error = {
-                "code": -32603,
-                "message": str(e)
+            result = {
+                "content": [{"type": "text", "text": f"Install failed: {str(e)}"}],
+                "isError": True
             }
-        
-        if msg_id is not None:
-            response = {
-                "jsonrpc": "2.0",
-                "id": msg_id
+        return result
+
+    def _pip_install(self, packages):
+        """
+        Run `pip install` in a fresh interpreter and return (exit code, stderr). A new process
+        per call sees exactly the running interpreter's environment (not the Nexus venv that
+        inject_nexus_env() adds to this process's sys.path) and keeps pip's state out of ours.
+        """
+        # stdout is not reported, and close_fds=False (our descriptors are all
+        # non-inheritable, PEP 446) keeps CPython on its posix_spawn fast path
+        proc = subprocess.run([*_PIP_INSTALL_CMD, *packages], stdout=subprocess.DEVNULL,
+                              stderr=subprocess.PIPE, text=True, close_fds=False, timeout=_PIP_TIMEOUT)
+        return proc.returncode, proc.stderr
+
+    def _tool_start_watcher(self, args):
+        if self.watcher:
+            self.watcher.stop()
+
+        paths = args.get("paths", [])
+        self.watcher = NexusWatcher(self.library, paths)
+        success = self.watcher.start()
+
+        if success:
+            result = {
+                "content": [{"type": "text", "text": f"👁️  Watcher started for: {', '.join(paths)}"}]
             }
-            if error:
-                response["error"] = error
-                if session_logger and method == "tools/call":
-                    session_logger.log_command(params.get("name", "unknown"), "ERROR", result=error.get("message"))
-            else:
-                response["result"] = result
-                if session_logger and method == "tools/call":
-                    res_text = json.dumps(result)[:200] + "..." if result else "None"
-                    session_logger.log_command(params.get("name", "unknown"), "SUCCESS", result=res_text)
-            return response
-        
-        return None
+        else:
+            result = {
+                "content": [{"type": "text", "text": "❌ Failed to start watcher (Check logs for details)"}],
+                "isError": True
+            }
+        return result
+
+    def _tool_get_watcher_logs(self, args):
+        self.library.cursor.execute(
+            "SELECT l.content FROM links l"
+            " JOIN link_categories lc ON lc.link_id = l.id"
+            " JOIN categories c ON c.id = lc.category_id"
+            " WHERE c.name = 'debug' ORDER BY l.id DESC LIMIT 10"
+        )
+        rows = self.library.cursor.fetchall()
+        text = "Recent Watcher Events:\n" + ("\n".join([r[0] for r in rows]) if rows else "No events recorded.")
+        return {
+            "content": [{"type": "text", "text": text}]
+        }
+
+    def _tool_prepopulate_docs(self, args):
+        path = args.get("path")
+        success = self.library.prepopulate_docs(path)
+        return {
+            "content": [{"type": "text", "text": f"{'✅' if success else '❌'} Documentation prepopulated at {path}"}]
+        }
+
+    def _tool_link_categories(self, args):
+        sid = args.get("server_id")
+        tags = args.get("tags", [])
+        self.library.link_categories(sid, tags)
+        return {
+            "content": [{"type": "text", "text": f"✅ Linked {len(tags)} tags to {sid}"}]
+        }
+
+    def _tool_list_stacks(self, args):
+        stacks = self.library.list_stacks()
+        if stacks:
+            text = "Available stacks:\n" + "\n".join(f"- {s}" for s in stacks)
+        else:
+            text = "No stacks yet. Add resources with a stack name to create one."
+        return {"content": [{"type": "text", "text": text}]}
+
+    def _tool_get_categories(self, args):
+        stack = args.get("stack") or None
+        cats = self.library.get_categories(stack=stack)
+        if cats:
+            header = f"Categories{' in stack ' + stack if stack else ' (all stacks)'}:"
+            lines = [header]
+            for c in cats:
+                indent = "  " if c["order"] == 1 else "    └─ "
+                lines.append(f"{indent}{c['category']}  ({c['count']} resources)")
+            text = "\n".join(lines)
+        else:
+            text = "No categories found."
+        return {"content": [{"type": "text", "text": text}]}
+
+    _SELECT_CONTENT_SQL = "SELECT content FROM links WHERE url = ?"
+    # file:// reads that miss the DB return at most this much text
+    _FILE_READ_MAX_BYTES = 1024 * 1024
+
+    # Short-lived cache for file/remote reads; large bodies bypass it to bound memory
+    _RES_CACHE_MAX = 128
+    _RES_CACHE_TTL = 60.0
+    _RES_CACHE_MAX_CHARS = 256 * 1024
+
+    def _cached_resource(self, uri: str, sig: Optional[str] = None) -> Optional[str]:
+        entry = self._res_cache.get(uri)
+        if entry is None:
+            return None
+        if time.monotonic() - entry[0] >= self._RES_CACHE_TTL or entry[2] != sig:
+            del self._res_cache[uri]
+            return None
+        self._res_cache.move_to_end(uri)
+        return entry[1]
+
+    def _cache_resource(self, uri: str, text: str, sig: Optional[str] = None) -> str:
+        if len(text) <= self._RES_CACHE_MAX_CHARS:
+            self._res_cache[uri] = (time.monotonic(), text, sig)
+            self._res_cache.move_to_end(uri)
+            if len(self._res_cache) > self._RES_CACHE_MAX:
+                self._res_cache.popitem(last=False)
+        return text
 
     def _read_resource(self, uri: str) -> str:
         # Check DB first
-        self.library.cursor.execute("SELECT content FROM links WHERE url = ?", (uri,))
-        row = self.library.cursor.fetchone()
+        row = self.library.conn.execute(self._SELECT_CONTENT_SQL, (uri,)).fetchone()
         if row and row[0]:
             return row[0]
-        
+
         # Fallback to local file if it exists and path matches
         # uri format: file:///path/to/file
-        # SECURITY: Only allow reading files within the current working directory to prevent traversal
+        # SECURITY: Only allow reading files within the allowed roots below to prevent traversal
         if uri.startswith("file://"):
             try:
-                path = Path(uri.replace("file://", "")).resolve()
-                # SECURITY: Allow reading if file exists and is within a recognized Nexus workspace
+                path = Path(uri[len("file://"):]).resolve()
+                # SECURITY: Allow reading if file exists and is within a recognized Nexus workspace.
+                # Containment is checked on whole path components (so /a/bc is not under /a/b),
+                # and before anything else touches the filesystem.
                 allowed_roots = [
                     self.library.app_dir.parent, # ~/.mcp-tools
                     Path("/Users/almowplay/Developer/Github") # Active developer root
                 ]
-                is_allowed = any(str(path).startswith(str(root)) for root in allowed_roots)
+                is_allowed = any(path == root or root in path.parents for root in allowed_roots)
                 
-                if path.exists() and is_allowed:
-                     # Binary check: try reading as text, if fails return base64 or msg
+                if is_allowed and path.exists():
+                     # Binary check: sniff the head for NUL bytes, and never read past the cap
                      try:
-                         return path.read_text(errors='ignore')
+                         with path.open('rb') as f:
+                             st = os.fstat(f.fileno())
+                             # A cached read is only reused while size and mtime are unchanged
+                             sig = _stat_sig(st)
+                             cached = self._cached_resource(uri, sig)
+                             if cached is not None:
+                                 return cached
+                             size = st.st_size
+                             raw = f.read(self._FILE_READ_MAX_BYTES)
+                         if _looks_binary(raw):
+                             return f"[Binary File] Size: {size} bytes"
+                         text = _decode_text(raw)
+                         if size > len(raw):
+                             text += f"\n[Truncated at 1MB of {size} bytes]"
+                         return self._cache_resource(uri, text, sig)
                      except OSError as e:
                          logger.error(f"OS error: {e}", exc_info=True)
                          return f"[Binary File] Size: {path.stat().st_size} bytes"
@@ -1440,16 +2546,14 @@ class MCPServer:
         
         # Enable Remote Fetching (Unified Data Retrieval)
         if uri.startswith("http://") or uri.startswith("https://"):
+            cached = self._cached_resource(uri)
+            if cached is not None:
+                return cached
             try:
-                # Basic fetch with User-Agent to avoid eager bot blocking
-                req = urllib.request.Request(
-                    uri, 
-                    headers={'User-Agent': 'Nexus-Librarian/1.0 (MCP-Unified-Retrieval)'}
-                )
-                with urllib.request.urlopen(req, timeout=10) as response:
-                    # Limit size to 1MB to prevent memory issues
-                    data = response.read(1024 * 1024)
-                    return data.decode('utf-8', errors='ignore')
+                # Limit size to 1MB to prevent memory issues
+                return self._cache_resource(uri, _fetch_remote(uri).decode('utf-8', errors='ignore'))
+            except RemoteTooLarge as e:
+                return f"[Remote too large: {e.size} bytes]"
             except Exception as e:
                 # Return error as content so agent knows why it failed
                 return f"Error retrieving remote resource: {e}"
@@ -1457,39 +2561,62 @@ class MCPServer:
         raise ValueError(f"Resource not found: {uri}")
 
 
+# Sibling tools of the Git-Packager suite, expected as folders next to this checkout
+_SUITE_ROOT = Path(__file__).parent.parent
+_SIBLINGS = (
+    ("mcp-injector", "The Surgeon"),
+    ("mcp-server-manager", "The Observer"),
+    ("repo-mcp-packager", "The Activator"),
+)
+
 def check_suite():
     """Detect presence of sibling tools in the Git-Packager suite."""
-    siblings = {
-        "mcp-injector": "The Surgeon",
-        "mcp-server-manager": "The Observer",
-        "repo-mcp-packager": "The Activator"
-    }
     print("📋 Workforce Suite Checkback:")
-    root = Path(__file__).parent.parent
-    for folder, persona in siblings.items():
-        exists = (root / folder).exists()
+    # One directory listing instead of a stat per sibling
+    try:
+        with os.scandir(_SUITE_ROOT) as entries:
+            present = {e.name for e in entries if e.is_dir()}
+    except OSError:
+        present = set()
+    for folder, persona in _SIBLINGS:
+        exists = folder in present
         status = "✅ PRESENT" if exists else "❌ MISSING"
         print(f"  {persona:<15} ({folder:<20}): {status}")
 
 def cmd_bootstrap():
     """Universal bootstrapper for the Librarian."""
     try:
-        import importlib.util
+        import runpy
         local_bootstrap = Path(__file__).parent / "bootstrap.py"
         if not local_bootstrap.exists():
             print("❌ Local bootstrap.py not found.")
             return 1
         
-        spec = importlib.util.spec_from_file_location("bootstrap", local_bootstrap)
-        bootstrap = importlib.util.module_from_spec(spec)
-        spec.loader.exec_module(bootstrap)
-        bootstrap.main()
+        bootstrap_main = runpy.run_path(str(local_bootstrap), run_name="bootstrap").get("main")
+        if bootstrap_main:
+            bootstrap_main()
         return 0
     except Exception as e:
         print(f"❌ Bootstrap failed: {e}")
         return 1
 
 def main():
+    # Fast path: MCP clients spawn bare `--server` constantly, so single-flag
+    # launches dispatch directly without importing argparse or building the parser.
+    argv = sys.argv[1:]
+    if argv == ['--server']:
+        MCPServer().run()
+        return
+    if argv == ['--check']:
+        check_suite()
+        return
+    if argv == ['--bootstrap']:
+        sys.exit(cmd_bootstrap())
+    if argv == ['--index-suite']:
+        SecureMcpLibrary().index_nexus_suite()
+        return
+
+    import argparse
     parser = argparse.ArgumentParser(
         description="MCP Link Library - The Librarian",
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -1546,7 +2673,6 @@ def main():
         return
 
     if args.status:
-        import subprocess as _sp
         print(f"Nexus v{_NEXUS_VERSION}")
         print()
         rows = []
@@ -1556,7 +2682,7 @@ def main():
             alive = False
             if installed:
                 try:
-                    r = _sp.run([str(path), "--version"], stdout=_sp.PIPE, stderr=_sp.PIPE, timeout=5, shell=False)
+                    r = subprocess.run([str(path), "--version"], stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=5, shell=False)
                     alive = r.returncode == 0
                 except Exception:
                     alive = False
@@ -1656,10 +2782,11 @@ def main():
         if not links:
             print("No links found.")
         else:
-            print(f"{'ID':<4} {'Domain':<20} {'Categories':<20} {'Title'}")
-            print("-" * 60)
-            for l in links:
-                print(f"{l[0]:<4} {l[3]:<20} {l[4]:<20} {l[2] or l[1]}")
+            # One write for the whole table instead of a print() per row
+            rows = [f"{'ID':<4} {'Domain':<20} {'Categories':<20} {'Title'}", "-" * 60]
+            rows += [f"{l[0]:<4} {l[3]:<20} {l[4]:<20} {l[2] or l[1]}" for l in links]
+            rows.append("")
+            sys.stdout.write("\n".join(rows))
                 
     elif args.delete:
         library.delete_link(args.delete)
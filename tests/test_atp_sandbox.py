@@ -0,0 +1,187 @@
+"""
+tests/test_atp_sandbox.py — Unit tests for ATPSandbox validation and execution.
+
+Covers:
+- Repeat submissions of identical code hit the validation/compile cache
+- Security verdicts are cached alongside successful compilations
+- Without an explicit result, only snippet-defined names are returned
+- print() output is captured into "logs" and never reaches the real stdout
+- Concurrent executions keep their captures separate and never swap sys.stdout
+- Every Phase 2 pattern is covered by the cheap trigger precheck
+- context is exposed as a read-only mapping
+- Oversized and deeply nested snippets are rejected up front; long flat chains are not
+- A cache_dir persists validated code objects across processes
+- jit=True matches the exec() result and falls back for non-numeric context
+"""
+
+import io
+import sys
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from unittest.mock import patch
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import atp_sandbox
+from atp_sandbox import ATPSandbox
+
+
+class TestValidationCache(unittest.TestCase):
+
+    def setUp(self):
+        atp_sandbox._validate_and_compile.cache_clear()
+        self.sb = ATPSandbox()
+
+    def test_repeat_code_hits_cache(self):
+        code = "result = [x for x in context['items'] if x > 1]"
+        first = self.sb.execute(code, {"items": [1, 2, 3]})
+        second = self.sb.execute(code, {"items": [5, 0]})
+        self.assertEqual(first["result"], [2, 3])
+        self.assertEqual(second["result"], [5])
+        info = atp_sandbox._validate_and_compile.cache_info()
+        self.assertEqual(info.misses, 1)
+        self.assertEqual(info.hits, 1)
+
+    def test_violation_is_cached(self):
+        code = "import os"
+        for _ in range(2):
+            resp = self.sb.execute(code)
+            self.assertFalse(resp["success"])
+            self.assertIn("Security Violation", resp["error"])
+        self.assertEqual(atp_sandbox._validate_and_compile.cache_info().hits, 1)
+
+
+class TestPhase2Precheck(unittest.TestCase):
+
+    def test_triggers_cover_every_dangerous_pattern(self):
+        for pattern in atp_sandbox._DANGEROUS_SUBSTRINGS:
+            self.assertTrue(any(t in pattern for t in atp_sandbox._DANGEROUS_TRIGGERS), pattern)
+
+    def test_pattern_in_string_literal_still_blocked(self):
+        resp = ATPSandbox().execute("result = 'x.__class__'")
+        self.assertFalse(resp["success"])
+        self.assertIn("forbidden pattern", resp["error"])
+
+
+class TestDosGuards(unittest.TestCase):
+
+    def test_oversized_code_rejected_before_parse(self):
+        code = "x = 1\n" * (atp_sandbox.MAX_CODE_LEN // 6 + 1)
+        with patch.object(atp_sandbox.ast, "parse") as parse:
+            resp = ATPSandbox().execute(code)
+        parse.assert_not_called()
+        self.assertFalse(resp["success"])
+        self.assertIn("too large", resp["error"])
+
+    def test_deep_nesting_rejected(self):
+        code = "result = " + "[" * 40 + "]" * 40
+        resp = ATPSandbox().execute(code)
+        self.assertFalse(resp["success"])
+        self.assertIn("nesting", resp["error"])
+
+    def test_long_flat_chains_accepted(self):
+        sb = ATPSandbox()
+        self.assertEqual(sb.execute("result = " + "+".join(["1"] * 200))["result"], 200)
+        self.assertTrue(sb.execute("result = " + " and ".join(["True"] * 100))["result"])
+        ladder = "x = 50\n" + "".join(f"{'el' if n else ''}if x == {n}:\n    result = {n}\n" for n in range(60))
+        self.assertEqual(sb.execute(ladder)["result"], 50)
+        chained = "result = 'a b'" + ".strip()" * 60 + ".split()"
+        self.assertEqual(sb.execute(chained)["result"], ["a", "b"])
+
+
+class TestDiskCache(unittest.TestCase):
+
+    def setUp(self):
+        atp_sandbox._validate_and_compile.cache_clear()
+
+    def test_second_process_skips_validation(self):
+        code = "result = sum(context['data'])"
+        with tempfile.TemporaryDirectory() as tmp:
+            first = ATPSandbox(cache_dir=Path(tmp)).execute(code, {"data": [1, 2]})
+            self.assertEqual(len(list(Path(tmp).glob("*.pyc"))), 1)
+            # Simulate a fresh process: empty in-memory cache, same directory
+            atp_sandbox._validate_and_compile.cache_clear()
+            with patch.object(atp_sandbox, "_validate_uncached") as validate:
+                second = ATPSandbox(cache_dir=Path(tmp)).execute(code, {"data": [3, 4]})
+            validate.assert_not_called()
+        self.assertEqual(first["result"], 3)
+        self.assertEqual(second["result"], 7)
+
+    def test_violations_are_not_persisted(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            resp = ATPSandbox(cache_dir=Path(tmp)).execute("import os")
+            self.assertFalse(resp["success"])
+            self.assertEqual(list(Path(tmp).iterdir()), [])
+
+
+class TestResultExtraction(unittest.TestCase):
+
+    def test_implicit_result_excludes_injected_names(self):
+        resp = ATPSandbox().execute("total = 5\nlimit = 2\nkept = [x for x in range(total) if x > limit]")
+        self.assertEqual(resp["result"], {"total": 5, "limit": 2, "kept": [3, 4]})
+
+
+class TestReadOnlyContext(unittest.TestCase):
+
+    def test_context_writes_are_rejected(self):
+        ctx = {"items": [1]}
+        resp = ATPSandbox().execute("context['items'] = []", ctx)
+        self.assertFalse(resp["success"])
+        self.assertEqual(ctx, {"items": [1]})
+
+    def test_missing_context_reads_as_empty(self):
+        resp = ATPSandbox().execute("result = len(context)")
+        self.assertEqual(resp["result"], 0)
+
+
+class TestStdoutCapture(unittest.TestCase):
+
+    def test_print_is_captured_per_call(self):
+        sb = ATPSandbox()
+        with patch("sys.stdout", new_callable=io.StringIO) as real_stdout:
+            first = sb.execute("print('hello'); result = 1")
+            second = sb.execute("print('again'); result = 2")
+        self.assertEqual(first["logs"], "hello\n")
+        self.assertEqual(second["logs"], "again\n")
+        self.assertEqual(real_stdout.getvalue(), "")
+
+    def test_print_file_argument_cannot_escape_capture(self):
+        with patch("sys.stdout", new_callable=io.StringIO) as real_stdout:
+            resp = ATPSandbox().execute("print('x', file=None); result = 1")
+        self.assertEqual(resp["logs"], "x\n")
+        self.assertEqual(real_stdout.getvalue(), "")
+
+    def test_concurrent_captures_are_isolated(self):
+        sb = ATPSandbox()
+        code = "for i in range(200):\n    print(context['tag'])\nresult = 1"
+        original = sys.stdout
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(lambda n: sb.execute(code, {"tag": n}), range(32)))
+        self.assertIs(sys.stdout, original)
+        for n, resp in enumerate(results):
+            self.assertEqual(resp["logs"], f"{n}\n" * 200)
+
+    def test_no_print_yields_empty_logs(self):
+        resp = ATPSandbox().execute("result = 3")
+        self.assertTrue(resp["success"])
+        self.assertEqual(resp["logs"], "")
+
+
+@unittest.skipIf(atp_sandbox.numba is None, "numba not installed")
+class TestJitPath(unittest.TestCase):
+
+    def test_jit_matches_exec(self):
+        sb = ATPSandbox()
+        code = "result = sum([x * x for x in context['items'] if x > 2])"
+        ctx = {"items": [1, 2, 3, 4]}
+        self.assertEqual(sb.execute(code, ctx, jit=True), sb.execute(code, ctx))
+
+    def test_non_numeric_items_fall_back(self):
+        resp = ATPSandbox().execute("result = len(context['items'])", {"items": ["a", "b"]}, jit=True)
+        self.assertEqual(resp["result"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,335 @@
+"""
+tests/test_library_search.py — Unit tests for SecureMcpLibrary search and listing.
+
+Covers:
+- FTS5 search matches title/url/content by word prefix, ignoring accents
+- Replaced and deleted rows drop out of the FTS index
+- Pre-existing rows are indexed when the FTS table is first created
+- Bulk first scans rebuild the FTS index once and leave its triggers in place
+- Category filters use the link_categories junction (all listed names must match)
+- Legacy NULL stacks are backfilled to 'default' and stack filters hit the index
+- limit/offset/columns narrow list_links() in SQL; count_links() matches the unlimited list
+- FileIndexer compiles .gitignore patterns once and still honours them in scan()
+- Without pathspec, negation, directory-only and '**' patterns follow gitignore rules
+- Ignored directories are pruned from the walk instead of filtered file by file
+- Threaded scan() yields the same records, in the same order, as a single worker
+- Binary and oversized files are skipped by scan() before being decoded
+- Re-indexing and add_link() skip files whose size and mtime are unchanged
+- NexusWatcher coalesces bursts of events per path into one re-index per flush
+- Only roots on network mounts are watched by polling
+- Plain <title>/<meta description> heads are read without a DOM parser; odd markup defers to it
+"""
+
+import sqlite3
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import mock_open, patch
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import mcp
+from mcp import FileIndexer, NexusWatcher, SecureMcpLibrary
+
+
+def _insert(lib, url, title, content, categories="file,code"):
+    lib.cursor.execute(
+        "INSERT OR REPLACE INTO links (url, title, domain, description, categories, content) "
+        "VALUES (?, ?, ?, ?, ?, ?)",
+        (url, title, "local-file", f"Local file: {title}", categories, content),
+    )
+    lib.conn.commit()
+
+
+class TestFtsSearch(unittest.TestCase):
+
+    def setUp(self):
+        self.lib = SecureMcpLibrary(db_path=":memory:")
+
+    def test_prefix_match_on_content(self):
+        _insert(self.lib, "file:///a.md", "a.md", "alpha Widget here")
+        _insert(self.lib, "file:///b.md", "b.md", "nothing to see")
+        urls = [r[1] for r in self.lib.list_links(search="widg")]
+        self.assertEqual(urls, ["file:///a.md"])
+
+    def test_replace_and_delete_keep_index_in_sync(self):
+        _insert(self.lib, "file:///a.md", "a.md", "old words")
+        _insert(self.lib, "file:///a.md", "a.md", "new words")
+        self.assertEqual(self.lib.list_links(search="old"), [])
+        self.assertEqual(len(self.lib.list_links(search="new")), 1)
+        self.lib.cursor.execute("DELETE FROM links WHERE url = 'file:///a.md'")
+        self.assertEqual(self.lib.list_links(search="words"), [])
+
+    def test_accents_are_folded(self):
+        _insert(self.lib, "file:///c.md", "c.md", "Café Crème notes")
+        self.assertEqual(len(self.lib.list_links(search="cafe creme")), 1)
+
+    def test_bulk_scan_rebuilds_index_once(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            for n in range(5):
+                Path(tmp, f"f{n}.md").write_text(f"bulk{n} body")
+            with patch.object(SecureMcpLibrary, "_FTS_BULK_MIN", 2), \
+                 patch.object(SecureMcpLibrary, "_BATCH_SIZE", 2), \
+                 patch.object(self.lib, "_rebuild_fts_index", wraps=self.lib._rebuild_fts_index) as rebuild:
+                self.lib.index_directory(tmp)
+        rebuild.assert_called_once()
+        self.assertEqual(len(self.lib.list_links(search="bulk0")), 1)
+        self.assertEqual(len(self.lib.list_links(search="bulk4")), 1)
+        # Triggers are back: later writes keep the index in sync
+        _insert(self.lib, "file:///late.md", "late.md", "latecomer")
+        self.assertEqual(len(self.lib.list_links(search="latecomer")), 1)
+
+    def test_punctuation_only_search_falls_back_to_like(self):
+        _insert(self.lib, "file:///a-b.md", "a-b.md", "x")
+        self.assertEqual(len(self.lib.list_links(search="-")), 1)
+
+
+class TestCategoryFilter(unittest.TestCase):
+
+    def setUp(self):
+        self.lib = SecureMcpLibrary(db_path=":memory:")
+
+    def test_index_directory_and_update_sync_junction(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            Path(tmp, "notes.md").write_text("hello")
+            self.lib.index_directory(tmp)
+        rows = self.lib.list_links(category="file,code")
+        self.assertEqual([r[2] for r in rows], ["notes.md"])
+        self.assertEqual(self.lib.list_links(category="file,docs"), [])
+
+        self.lib.update_link(rows[0][0], categories=["docs", "api"])
+        self.assertEqual(self.lib.list_links(category="file"), [])
+        self.assertEqual(len(self.lib.list_links(category="api")), 1)
+
+    def test_category_is_exact_name_not_substring(self):
+        _insert(self.lib, "file:///a.md", "a.md", "x", categories="docs")
+        self.lib._sync_categories("1=1")
+        self.assertEqual(self.lib.list_links(category="doc"), [])
+        self.assertEqual(len(self.lib.list_links(category="docs")), 1)
+
+    def test_deleted_link_leaves_no_junction_rows(self):
+        _insert(self.lib, "file:///a.md", "a.md", "x", categories="docs")
+        self.lib._sync_categories("1=1")
+        self.lib.cursor.execute("DELETE FROM links")
+        self.assertEqual(self.lib.cursor.execute("SELECT COUNT(*) FROM link_categories").fetchone()[0], 0)
+
+
+class TestListProjection(unittest.TestCase):
+
+    def setUp(self):
+        self.lib = SecureMcpLibrary(db_path=":memory:")
+        for i in range(5):
+            _insert(self.lib, f"file:///{i}.md", f"{i}.md", "x")
+        self.lib._sync_categories("1=1")
+
+    def test_limit_and_columns(self):
+        rows = self.lib.list_links(category="file,code", limit=3, columns=("url", "title"))
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[0], ("file:///0.md", "0.md"))
+        self.assertEqual(self.lib.count_links(category="file,code"), 5)
+
+    def test_offset_pages_through_results(self):
+        urls = [r[0] for r in self.lib.list_links(columns=("url",))]
+        page = self.lib.list_links(limit=2, offset=2, columns=("url",))
+        self.assertEqual([r[0] for r in page], urls[2:4])
+        self.assertEqual(len(self.lib.list_links(offset=4)), 1)
+
+    def test_unknown_column_rejected(self):
+        with self.assertRaises(ValueError):
+            self.lib.list_links(columns=("url", "content; DROP TABLE links"))
+
+
+class TestSchemaMigration(unittest.TestCase):
+
+    def test_existing_rows_are_indexed(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            db = str(Path(tmp) / "knowledge.db")
+            conn = sqlite3.connect(db)
+            conn.execute("CREATE TABLE links (id INTEGER PRIMARY KEY, url TEXT UNIQUE NOT NULL, "
+                         "title TEXT, domain TEXT NOT NULL, description TEXT, categories TEXT, "
+                         "is_active BOOLEAN DEFAULT 1, created_at DATETIME, hash TEXT, content TEXT)")
+            conn.execute("INSERT INTO links (url, title, domain, content) "
+                         "VALUES ('file:///z', 'z', 'local-file', 'legacy zebra')")
+            conn.execute("UPDATE links SET categories = 'legacy,misc'")
+            conn.commit()
+            conn.close()
+            lib = SecureMcpLibrary(db_path=db)
+            self.assertEqual([r[1] for r in lib.list_links(search="zebra")], ["file:///z"])
+            self.assertEqual([r[1] for r in lib.list_links(category="legacy")], ["file:///z"])
+            lib.conn.close()
+
+    def test_fts_index_without_accent_folding_is_rebuilt(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            db = str(Path(tmp) / "knowledge.db")
+            lib = SecureMcpLibrary(db_path=db)
+            _insert(lib, "file:///r", "r", "résumé")
+            lib.conn.executescript("DROP TABLE links_fts; CREATE VIRTUAL TABLE links_fts USING fts5("
+                                   "title, url, description, content, content='links', content_rowid='id');")
+            lib.conn.close()
+            lib = SecureMcpLibrary(db_path=db)
+            self.assertEqual([r[1] for r in lib.list_links(search="resume")], ["file:///r"])
+            lib.conn.close()
+
+    def test_null_stack_backfilled_and_indexed(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            db = str(Path(tmp) / "knowledge.db")
+            SecureMcpLibrary(db_path=db).conn.close()
+            conn = sqlite3.connect(db)
+            conn.execute("INSERT INTO links (url, domain, stack) VALUES ('file:///n', 'local-file', NULL)")
+            conn.commit()
+            conn.close()
+            lib = SecureMcpLibrary(db_path=db)
+            self.assertEqual(lib.list_stacks(), ["default"])
+            self.assertEqual([r[1] for r in lib.list_links(stack="default")], ["file:///n"])
+            plan = lib.conn.execute("EXPLAIN QUERY PLAN SELECT id FROM links "
+                                    "WHERE is_active = 1 AND stack = 'default'").fetchall()
+            self.assertIn("idx_links_active_stack", str(plan))
+            lib.conn.close()
+
+
+class TestFileIndexer(unittest.TestCase):
+
+    def test_gitignore_patterns_applied_in_scan(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            (root / ".gitignore").write_text("# comment\n*.log.md\n/build\n")
+            (root / "keep.md").write_text("k")
+            (root / "debug.log.md").write_text("d")
+            (root / "build").mkdir()
+            (root / "build" / "out.md").write_text("b")
+            (root / "node_modules").mkdir()
+            (root / "node_modules" / "pkg.js").write_text("n")
+            names = sorted(f["rel_path"] for f in FileIndexer(tmp).scan())
+        self.assertEqual(names, ["keep.md"])
+
+    def test_standard_tier_gitignore_semantics(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            (root / ".gitignore").write_text("logs/\n*.tmp.md\n!keep.tmp.md\ndocs/**/draft.md\nnotes.md/\n"
+                                             "site/*\n!site/keep.md\n")
+            for rel in ("logs/a.md", "x.tmp.md", "keep.tmp.md", "docs/a/b/draft.md",
+                        "docs/final.md", "draft.md", "notes.md", "src/logs.md",
+                        "site/keep.md", "site/drop.md"):
+                (root / rel).parent.mkdir(parents=True, exist_ok=True)
+                (root / rel).write_text("x")
+            indexer = FileIndexer(tmp)
+            indexer._spec = None  # exercise the Standard tier even where pathspec is installed
+            self.assertFalse(indexer._dir_ignored("site"))
+            names = sorted(f["rel_path"].replace("\\", "/") for f in indexer.scan())
+        self.assertEqual(names, ["docs/final.md", "draft.md", "keep.tmp.md", "notes.md", "site/keep.md",
+                                 "src/logs.md"])
+
+    def test_ignored_directories_are_not_descended(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            (root / ".gitignore").write_text("/vendor\n")
+            for d in ("vendor", "node_modules", "src"):
+                (root / d).mkdir()
+                (root / d / "f.py").write_text("x")
+            indexer = FileIndexer(tmp)
+            with patch.object(indexer, "_should_ignore", wraps=indexer._should_ignore) as check:
+                names = [f["rel_path"] for f in indexer.scan()]
+        self.assertEqual(names, [str(Path("src", "f.py"))])
+        self.assertEqual(check.call_count, 1)
+
+    def test_binary_and_oversized_files_skipped(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            Path(tmp, "ok.txt").write_text("fine")
+            Path(tmp, "blob.txt").write_bytes(b"abc\x00def")
+            with patch("mcp.MAX_TEXT_BYTES", 8):
+                Path(tmp, "big.txt").write_text("x" * 9)
+                names = sorted(f["name"] for f in FileIndexer(tmp).scan())
+        self.assertEqual(names, ["ok.txt"])
+
+    def test_parallel_scan_matches_serial(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            for i in range(60):
+                Path(tmp, f"f{i}.txt").write_text(f"body {i}")
+            indexer = FileIndexer(tmp)
+            serial = list(indexer.scan(max_workers=1))
+            parallel = list(indexer.scan(max_workers=8))
+        self.assertEqual(len(serial), 60)
+        self.assertEqual(parallel, serial)
+
+
+class TestUnchangedFiles(unittest.TestCase):
+
+    def setUp(self):
+        self.lib = SecureMcpLibrary(db_path=":memory:")
+
+    def test_reindex_reads_only_changed_files(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            Path(tmp, "a.md").write_text("alpha")
+            Path(tmp, "b.md").write_text("beta")
+            self.lib.index_directory(tmp)
+            Path(tmp, "b.md").write_text("beta, edited")
+            with patch.object(FileIndexer, "_read_one", autospec=True,
+                              side_effect=FileIndexer._read_one) as read:
+                self.lib.index_directory(tmp)
+        self.assertEqual([c.args[2] for c in read.call_args_list], ["b.md"])
+        self.assertEqual(len(self.lib.list_links(search="edited")), 1)
+
+    def test_signature_lookup_never_reads_content_rows(self):
+        plan = self.lib.conn.execute("EXPLAIN QUERY PLAN SELECT url, file_sig FROM links "
+                                     "WHERE file_sig IS NOT NULL AND is_active = 1").fetchall()
+        self.assertIn("COVERING INDEX idx_links_file_sig", str(plan))
+
+    def test_add_link_reuses_content_of_unchanged_file(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            url = f"file://{Path(tmp).resolve()}/notes.txt"
+            Path(tmp, "notes.txt").write_text("first")
+            self.lib.add_link(url)
+            with patch.object(mcp, "_decode_text", wraps=mcp._decode_text) as decode:
+                self.lib.add_link(url, categories=["again"])
+                decode.assert_not_called()
+                Path(tmp, "notes.txt").write_text("second version")
+                self.lib.add_link(url)
+                decode.assert_called_once()
+        self.assertEqual(len(self.lib.list_links(search="second")), 1)
+
+
+class TestWatcherDebounce(unittest.TestCase):
+
+    def test_burst_of_events_reindexes_once(self):
+        lib = SecureMcpLibrary(db_path=":memory:")
+        watcher = NexusWatcher(lib, [])
+        with tempfile.TemporaryDirectory() as tmp:
+            path = str(Path(tmp, "notes.md"))
+            Path(path).write_text("draft")
+            for _ in range(5):
+                watcher._handle_change(path)
+            with patch.object(lib, "add_link", wraps=lib.add_link) as add:
+                watcher._flush_pending()  # still inside the debounce window
+                add.assert_not_called()
+                watcher._flush_pending(force=True)
+                add.assert_called_once()
+        self.assertEqual(len(lib.list_links(category="auto-indexed")), 1)
+        self.assertEqual(len(lib.list_links(category="debug")), 1)
+
+    def test_network_mounts_detected_by_longest_mount_point(self):
+        mounts = ("/dev/sda1 / ext4 rw 0 0\n"
+                  "server:/share /mnt/nas nfs4 rw 0 0\n"
+                  "/dev/sdb1 /mnt/nas/cache ext4 rw 0 0\n")
+        with patch("builtins.open", mock_open(read_data=mounts)):
+            self.assertTrue(mcp._is_network_mount("/mnt/nas/docs"))
+            self.assertFalse(mcp._is_network_mount("/mnt/nas/cache/docs"))
+            self.assertFalse(mcp._is_network_mount("/mnt/nasty"))
+            self.assertFalse(mcp._is_network_mount("/home/user"))
+
+
+class TestQuickHtmlMetadata(unittest.TestCase):
+
+    def test_plain_head_resolved_by_regex(self):
+        head = b'<head><title> A &amp; B </title><meta content="Hi" name="description"></head>'
+        self.assertEqual(mcp._quick_html_metadata(head, None), ("A & B", "Hi"))
+        self.assertEqual(mcp._quick_html_metadata(b"<title>T</title>", None), ("T", ""))
+
+    def test_unusual_markup_defers_to_parser(self):
+        self.assertIsNone(mcp._quick_html_metadata(b"<head><meta name='x'></head>", None))
+        self.assertIsNone(mcp._quick_html_metadata(
+            b'<title>T</title><meta property="og:description" content="d">', None))
+
+
+if __name__ == "__main__":
+    unittest.main()
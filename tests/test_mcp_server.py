@@ -0,0 +1,196 @@
+"""
+tests/test_mcp_server.py — Unit tests for MCPServer resource reads.
+
+Covers:
+- Remote reads are served from the in-process cache until the TTL expires
+- Failed and oversized reads are never cached
+- Cached file:// reads are dropped as soon as the file changes
+- A Content-Length over the cap is refused before the body is read
+- Remote validators (ETag/Last-Modified) are kept for small bodies and sent on repeat reads
+- file:// reads stub out binary files and truncate large text at the cap
+- file:// reads outside the allowed roots are refused, including prefix lookalikes
+- tools/list serves the prebuilt manifest; search_api matches it case-insensitively
+- search_api matches word prefixes in any order, on top of the plain substring match
+- search_knowledge_base caps its listing and reports how many matches were left out
+- check_health reflects packages installed by update_dependencies without a restart
+"""
+
+import json
+import sys
+import tempfile
+import unittest
+from collections import OrderedDict
+from pathlib import Path
+from unittest.mock import patch
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import mcp
+from mcp import MCPServer, SecureMcpLibrary
+
+
+def _server():
+    # Skip __init__: no on-disk DB, log directory or watcher needed for these tests
+    server = MCPServer.__new__(MCPServer)
+    server.library = SecureMcpLibrary(db_path=":memory:")
+    server._res_cache = OrderedDict()
+    return server
+
+
+class TestResourceCache(unittest.TestCase):
+
+    def test_repeat_remote_read_hits_cache_until_ttl(self):
+        server = _server()
+        with patch.object(mcp, "_fetch_remote", return_value=b"body") as fetch:
+            self.assertEqual(server._read_resource("https://example.com/a"), "body")
+            self.assertEqual(server._read_resource("https://example.com/a"), "body")
+            self.assertEqual(fetch.call_count, 1)
+            with patch.object(mcp.time, "monotonic", return_value=mcp.time.monotonic() + 61):
+                server._read_resource("https://example.com/a")
+            self.assertEqual(fetch.call_count, 2)
+
+    def test_errors_and_large_bodies_are_not_cached(self):
+        server = _server()
+        with patch.object(mcp, "_fetch_remote", side_effect=OSError("down")):
+            self.assertIn("Error retrieving", server._read_resource("https://example.com/x"))
+        big = b"x" * (MCPServer._RES_CACHE_MAX_CHARS + 1)
+        with patch.object(mcp, "_fetch_remote", return_value=big):
+            server._read_resource("https://example.com/big")
+        self.assertEqual(len(server._res_cache), 0)
+
+    def test_file_read_cache_follows_file_changes(self):
+        server = _server()
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp).resolve()
+            server.library.app_dir = root / "librarian"
+            note = root / "note.txt"
+            note.write_text("first")
+            uri = f"file://{note}"
+            self.assertEqual(server._read_resource(uri), "first")
+            with patch.object(mcp, "_decode_text", side_effect=AssertionError("cache miss")):
+                self.assertEqual(server._read_resource(uri), "first")
+            note.write_text("second!")
+            self.assertEqual(server._read_resource(uri), "second!")
+
+    def test_advertised_oversize_body_is_refused(self):
+        mcp._check_content_length({"Content-Length": str(mcp._REMOTE_MAX_BYTES)})
+        mcp._check_content_length({"Transfer-Encoding": "chunked"})
+        with self.assertRaises(mcp.RemoteTooLarge):
+            mcp._check_content_length({"Content-Length": str(mcp._REMOTE_MAX_BYTES + 1)})
+        server = _server()
+        with patch.object(mcp, "_fetch_remote", side_effect=mcp.RemoteTooLarge(5 << 20)):
+            self.assertEqual(server._read_resource("https://example.com/iso"), "[Remote too large: 5242880 bytes]")
+        self.assertEqual(len(server._res_cache), 0)
+
+    def test_conditional_get_validators(self):
+        uri = "https://example.com/etag"
+        self.addCleanup(mcp._REMOTE_VALIDATORS.pop, uri, None)
+        mcp._remember_validators(uri, {"ETag": '"v1"'}, bytearray(b"body"))
+        self.assertEqual(mcp._conditional_headers(uri), {"If-None-Match": '"v1"'})
+        self.assertEqual(mcp._not_modified(uri), b"body")
+        # Large bodies and responses without validators are not kept for revalidation
+        mcp._remember_validators(uri, {"ETag": '"v2"'}, bytearray(mcp._REMOTE_VALIDATOR_MAX_BYTES + 1))
+        self.assertEqual(mcp._conditional_headers(uri), {})
+
+
+class TestFileResourceRead(unittest.TestCase):
+
+    def test_binary_stub_and_truncation(self):
+        server = _server()
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp).resolve()
+            server.library.app_dir = root / "librarian"  # its parent is an allowed read root
+            (root / "blob.bin").write_bytes(b"\x89PNG\x00\x00data")
+            (root / "big.txt").write_text("abcdef")
+            self.assertEqual(server._read_resource(f"file://{root}/blob.bin"), "[Binary File] Size: 10 bytes")
+            with patch.object(MCPServer, "_FILE_READ_MAX_BYTES", 4):
+                text = server._read_resource(f"file://{root}/big.txt")
+        self.assertTrue(text.startswith("abcd\n[Truncated"))
+
+    def test_sibling_with_shared_prefix_is_refused(self):
+        server = _server()
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp).resolve()
+            (root / "tools").mkdir()
+            (root / "tools-evil").mkdir()
+            (root / "tools-evil" / "secret.txt").write_text("secret")
+            server.library.app_dir = root / "tools" / "librarian"
+            with patch.object(mcp, "_stat_sig", wraps=mcp._stat_sig) as sig:
+                text = server._read_resource(f"file://{root}/tools-evil/secret.txt")
+        self.assertTrue(text.startswith("Error: File not found"))
+        sig.assert_not_called()  # the cache key is only taken after the containment check
+
+
+class TestToolManifest(unittest.TestCase):
+
+    def test_tools_list_and_search_api_share_manifest(self):
+        server = _server()
+        self.assertIs(server._rpc_tools_list({})["tools"], mcp._TOOLS_MANIFEST)
+        found = json.loads(server._tool_search_api({"query": "Sandbox"})["content"][0]["text"])
+        self.assertEqual([t["name"] for t in found], ["execute_code"])
+
+    def test_search_api_word_index(self):
+        server = _server()
+
+        def names(query):
+            return [t["name"] for t in json.loads(server._tool_search_api({"query": query})["content"][0]["text"])]
+
+        self.assertEqual(names("code execute"), ["execute_code"])
+        self.assertEqual(names("watch logs"), ["get_watcher_logs"])
+        self.assertEqual(names("nowledge_b"), ["search_knowledge_base"])  # mid-word substring
+        self.assertEqual(names("zzz"), [])
+
+    def test_search_api_results_include_every_substring_match(self):
+        server = _server()
+        texts = [f"{t['name']} {t['description']}".lower() for t in mcp._TOOLS_MANIFEST]
+        queries = {text[i:i + n] for text in texts for n in (2, 3, 4, 6) for i in range(0, len(text), 5)}
+        for query in sorted(queries):
+            found = {t["name"] for t in json.loads(server._tool_search_api({"query": query})["content"][0]["text"])}
+            expected = {t["name"] for t in mcp._TOOLS_MANIFEST
+                        if query in t["name"].lower() or query in t["description"].lower()}
+            self.assertLessEqual(expected, found, query)
+
+
+class TestSearchKnowledgeBase(unittest.TestCase):
+
+    def test_results_capped_with_remainder_note(self):
+        server = _server()
+        server.library.conn.executemany(
+            "INSERT INTO links (url, title, domain, content, stack) VALUES (?, ?, ?, 'widget', ?)",
+            [(f"https://example.com/{n}", f"Doc {n}", "example.com", "default" if n else "lab") for n in range(5)])
+        with patch.object(MCPServer, "_SEARCH_RESULT_LIMIT", 2):
+            text = server._tool_search_knowledge_base({"query": "widget"})["content"][0]["text"]
+        lines = text.splitlines()
+        self.assertEqual(len(lines), 4)
+        self.assertIn("[example.com]", lines[1])
+        self.assertTrue(lines[3].startswith("... (3 more matches)"))
+        lab = server._tool_search_knowledge_base({"query": "widget", "stack": "lab"})["content"][0]["text"]
+        self.assertEqual(lab, "Found matches in stack 'lab':\n- [example.com] [lab] Doc 0 (https://example.com/0)\n")
+
+
+class TestHealthReport(unittest.TestCase):
+
+    def test_successful_install_refreshes_report(self):
+        server = _server()
+        mcp._health_text.cache_clear()
+        self.addCleanup(mcp._health_text.cache_clear)
+        installed = set()
+        real_available = mcp._module_available
+
+        def available(name):
+            return name in installed or (name != "pypdf" and real_available(name))
+
+        def health():
+            return server._tool_check_health({})["content"][0]["text"]
+
+        with patch.object(mcp, "_module_available", side_effect=available):
+            self.assertIn("pypdf: ❌", health())
+            installed.add("pypdf")
+            self.assertIn("pypdf: ❌", health())  # cached until an install succeeds
+            with patch.object(MCPServer, "_pip_install", return_value=(0, "")):
+                server._tool_update_dependencies({"packages": "pypdf"})
+            self.assertIn("pypdf: ✅", health())
+
+
+if __name__ == "__main__":
+    unittest.main()
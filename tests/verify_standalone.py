@@ -16,6 +16,7 @@ class TestStandaloneResilience(unittest.TestCase):
         
         # Simulate missing optional packages
         with patch.dict(sys.modules, {
+            'fitz': None,
             'pypdf': None,
             'openpyxl': None,
             'docx': None,
@@ -31,6 +32,7 @@ class TestStandaloneResilience(unittest.TestCase):
             
             # 1. Verify Globals are None
             print("   - Verifying optional imports are handled...")
+            self.assertIsNone(mcp.fitz, "fitz should be None")
             self.assertIsNone(mcp.pypdf, "pypdf should be None")
             self.assertIsNone(mcp.openpyxl, "openpyxl should be None")
             self.assertIsNone(mcp.docx, "docx should be None")